@@ -1,14 +1,24 @@
+import os
 import sys
 import json
+import time
+import sqlite3
+import uuid
+import hashlib
+import zlib
+import threading
 import requests
 from datetime import datetime
+from itertools import chain
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QListWidget, QFileDialog,
     QMessageBox, QScrollArea, QGridLayout, QTableWidget, QTableWidgetItem,
-    QStackedWidget, QFrame, QListWidgetItem
+    QStackedWidget, QFrame, QListWidgetItem, QCheckBox, QProgressBar
 )
-from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtCore import Qt, QSize, QObject, QRunnable, QThreadPool, pyqtSignal
 from PyQt5.QtGui import QFont, QPalette, QColor
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
@@ -16,6 +26,514 @@ import matplotlib.pyplot as plt
 
 API_BASE_URL = 'https://equipmentanalyzer.pythonanywhere.com/api'
 
+# Kept connections; also the number of background requests run at once
+API_POOL_SIZE = 4
+# (connect, read) seconds. Uploads wait for the server to parse the file.
+API_TIMEOUT = (10, 60)
+UPLOAD_TIMEOUT = (10, 900)
+# Read size of streamed uploads, and gzip level used while uploading
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+GZIP_LEVEL = 6
+# Files of at least this size use the resumable upload API, which sends
+# them in chunks and picks up where it stopped after a dropped connection
+RESUMABLE_MIN_BYTES = 64 * 1024 * 1024
+JOB_POLL_INTERVAL = 1.0
+
+# Local copy of the upload history, browsable offline
+HISTORY_DB_PATH = os.path.join(os.path.expanduser('~'), '.equipment_visualizer', 'history.sqlite3')
+HISTORY_PAGE_SIZE = 100
+HISTORY_FIELDS = [
+    'id', 'file_name', 'uploaded_at', 'total_records', 'avg_flowrate',
+    'avg_pressure', 'avg_temperature', 'type_distribution', 'per_type_stats',
+]
+HISTORY_SUMMARY_FIELDS = HISTORY_FIELDS[:7]
+HISTORY_JSON_FIELDS = ('type_distribution', 'per_type_stats')
+
+
+# Magic bytes of the compression formats the server decompresses itself
+COMPRESSED_MAGIC = (b'\x1f\x8b', b'BZh', b'\x28\xb5\x2f\xfd')
+
+
+def is_compressed(path):
+    with open(path, 'rb') as f:
+        return f.read(4).startswith(COMPRESSED_MAGIC)
+
+
+def error_message(response, default):
+    """The ``error`` of an API error response, or ``default``."""
+    try:
+        return response.json().get('error', default)
+    except ValueError:
+        return f"{default} (HTTP {response.status_code})"
+
+
+class ApiError(Exception):
+    """An error answer of the API; the message is shown to the user."""
+
+
+def file_blocks(path, compress=False, progress=None, stage=None):
+    """
+    The bytes to upload for ``path``, gzipped on the fly with ``compress``.
+    With ``stage``, ``progress(stage, done, total)`` follows the file reads.
+    """
+    total = os.path.getsize(path)
+    done = 0
+    # wbits=31 writes a gzip container (with a zero timestamp), so the
+    # output is the same every time the file is read
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(UPLOAD_BLOCK_SIZE), b''):
+            done += len(block)
+            if stage is not None and progress is not None:
+                progress(stage, done, total)
+            if compressor is not None:
+                block = compressor.compress(block)
+            if block:
+                yield block
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def upload_size(path, compress=False, progress=None):
+    """Bytes ``file_blocks`` will produce; compressing needs a pass over the file."""
+    if not compress:
+        return os.path.getsize(path)
+    return sum(len(block) for block in file_blocks(path, True, progress, "Compressing"))
+
+
+# -----------------------------
+# API CLIENT
+# -----------------------------
+class ApiClient:
+    """
+    One ``requests.Session`` shared by every view: connections (and their
+    TLS sessions) are kept alive and reused, the token header is set once,
+    transient failures are retried with exponential backoff and every call
+    has a timeout. Safe to use from the worker threads.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, pool_size=API_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        # Connection failures are retried for every method (nothing was
+        # sent yet); read errors and 5xx answers only for idempotent ones,
+        # so an upload is never processed twice.
+        retry = Retry(
+            total=4,
+            connect=3,
+            read=2,
+            status=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def set_token(self, token):
+        if token:
+            self.session.headers['Authorization'] = f'Token {token}'
+        else:
+            self.session.headers.pop('Authorization', None)
+
+    def request(self, method, path, timeout=API_TIMEOUT, **kwargs):
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# -----------------------------
+# STREAMING UPLOADS
+# -----------------------------
+class MultipartEncoder:
+    """
+    A multipart/form-data request body with one file part, produced block
+    by block while requests sends it, so client memory stays flat whatever
+    the file size. ``progress(stage, done, total)`` is called after every
+    block (it may raise to abort the transfer).
+
+    With ``compress`` the file is gzipped on the fly. Django reads a request
+    body only up to its Content-Length and does not accept chunked uploads,
+    so the compressed size is measured first by a pass that discards its
+    output. gzip output is deterministic for the same input, and the real
+    pass is checked against that size.
+    """
+
+    def __init__(self, path, field='file', compress=False, progress=None):
+        self.path = path
+        self.compress = compress
+        self.progress = progress
+
+        file_name = os.path.basename(path) + ('.gz' if compress else '')
+        # Same escaping as requests/urllib3 use for file names
+        file_name = file_name.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+        self.head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field}"; filename="{file_name}"\r\n'
+            'Content-Type: application/octet-stream\r\n\r\n'
+        ).encode('utf-8')
+        self.tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+        self.file_size = upload_size(path, compress, progress)
+
+    def __len__(self):
+        return len(self.head) + self.file_size + len(self.tail)
+
+    def _report(self, stage, done, total):
+        if self.progress is not None:
+            self.progress(stage, done, total)
+
+    def __iter__(self):
+        total = len(self)
+        sent = 0
+        for block in chain([self.head], file_blocks(self.path, self.compress), [self.tail]):
+            sent += len(block)
+            if sent > total:
+                raise IOError("The file changed while it was being uploaded")
+            yield block
+            self._report("Uploading", sent, total)
+        if sent != total:
+            raise IOError("The file changed while it was being uploaded")
+        self._report("Processing", 0, 0)
+
+
+def iter_chunks(blocks, chunk_size):
+    """Regroup ``blocks`` of bytes into pieces of exactly ``chunk_size`` (the last may be short)."""
+    buffer = bytearray()
+    for block in blocks:
+        buffer += block
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class ResumableUpload:
+    """
+    Sends a large file through the resumable upload API
+    (``/upload_csv/sessions/``) in numbered, checksummed chunks, then waits
+    for the server to process it. When a chunk cannot be sent the session
+    is kept: calling ``run()`` again asks the server which chunks it
+    already has and sends only the others. (A compressed file is
+    compressed again from the start, only the transfer is skipped.)
+    """
+
+    def __init__(self, api, path, compress=False):
+        self.api = api
+        self.path = path
+        self.compress = compress
+        self.file_name = os.path.basename(path) + ('.gz' if compress else '')
+        self.size = None
+        self.session_id = None
+        self.chunk_size = None
+        self.job_id = None
+
+    def _session_url(self, suffix=''):
+        return f"upload_csv/sessions/{self.session_id}/{suffix}"
+
+    def _check(self, response, default):
+        if not response.ok:
+            raise ApiError(error_message(response, default))
+        return response.json()
+
+    def run(self, progress):
+        """Upload and process the file; returns the upload result of the API."""
+        if self.job_id is None:
+            self._send(progress)
+        return self._wait(progress)
+
+    def _send(self, progress):
+        if self.size is None:
+            self.size = upload_size(self.path, self.compress, progress)
+
+        received = set()
+        if self.session_id is not None:
+            response = self.api.get(self._session_url())
+            if response.ok:
+                session = response.json()
+                if session.get('job_id'):
+                    # Finalized already, only the response was lost
+                    self.job_id = session['job_id']
+                    return
+                received = set(session['received'])
+            else:
+                self.session_id = None  # expired: start over
+        if self.session_id is None:
+            session = self._check(self.api.post(
+                "upload_csv/sessions/",
+                json={'file_name': self.file_name, 'size': self.size}
+            ), 'Upload failed')
+            self.session_id = session['session_id']
+            self.chunk_size = session['chunk_size']
+
+        try:
+            sent = 0
+            blocks = file_blocks(self.path, self.compress)
+            for index, chunk in enumerate(iter_chunks(blocks, self.chunk_size)):
+                if index not in received:
+                    self._check(self.api.put(
+                        self._session_url(f"chunks/{index}/"),
+                        data=chunk,
+                        headers={
+                            'Content-Type': 'application/octet-stream',
+                            'X-Chunk-SHA256': hashlib.sha256(chunk).hexdigest(),
+                        },
+                        timeout=UPLOAD_TIMEOUT
+                    ), 'Upload failed')
+                sent += len(chunk)
+                progress("Uploading", sent, self.size)
+
+            progress("Processing", 0, 0)
+            response = self.api.post(self._session_url("finalize/"))
+            if response.status_code == 400:
+                self.session_id = None  # not a usable CSV, the server dropped it
+            job = self._check(response, 'Upload failed')
+        except TaskCancelled:
+            # Best effort: free the staged chunks on the server
+            try:
+                self.api.delete(self._session_url())
+            except requests.RequestException:
+                pass
+            raise
+        self.job_id = job['job_id']
+
+    def _wait(self, progress):
+        while True:
+            progress("Processing", 0, 0)
+            job = self._check(self.api.get(f"jobs/{self.job_id}/"), 'Upload failed')
+            if job['status'] == 'done':
+                return job['result']
+            if job['status'] == 'failed':
+                self.session_id = self.job_id = None
+                raise ApiError(job.get('error') or 'Processing failed')
+            time.sleep(JOB_POLL_INTERVAL)
+
+
+# -----------------------------
+# UPLOAD HISTORY CACHE
+# -----------------------------
+class HistoryCache:
+    """
+    The upload history of every account used on this computer, kept in
+    SQLite so it survives restarts and can be browsed offline.
+
+    ``sync()`` only asks the server for uploads newer than the watermark
+    of the last complete sync (``since_id``). Rows stored in between (the
+    login response, new uploads) do not move the watermark, so an
+    interrupted sync never leaves a gap. Every call opens its own
+    connection, so the cache can be used from the worker threads.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS uploads (
+            server TEXT NOT NULL,
+            username TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            uploaded_at TEXT,
+            total_records INTEGER,
+            avg_flowrate REAL,
+            avg_pressure REAL,
+            avg_temperature REAL,
+            type_distribution TEXT,
+            per_type_stats TEXT,
+            PRIMARY KEY (server, username, id)
+        );
+        CREATE INDEX IF NOT EXISTS uploads_recent
+            ON uploads (server, username, uploaded_at DESC, id DESC);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            server TEXT NOT NULL,
+            username TEXT NOT NULL,
+            last_id INTEGER NOT NULL,
+            synced_at TEXT NOT NULL,
+            PRIMARY KEY (server, username)
+        );
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH, server=API_BASE_URL):
+        self.path = path
+        self.server = server
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as db:
+            db.execute('PRAGMA journal_mode=WAL')  # reads don't wait for a sync
+            db.executescript(self.SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _query(self, sql, params=()):
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def uploads(self, username):
+        """Summaries of every cached upload, newest first."""
+        rows = self._query(
+            f"SELECT {', '.join(HISTORY_SUMMARY_FIELDS)} FROM uploads"
+            " WHERE server = ? AND username = ? ORDER BY uploaded_at DESC, id DESC",
+            (self.server, username)
+        )
+        return [dict(row) for row in rows]
+
+    def get(self, username, upload_id):
+        """One upload with its per-type stats, or None."""
+        rows = self._query(
+            f"SELECT {', '.join(HISTORY_FIELDS)} FROM uploads"
+            " WHERE server = ? AND username = ? AND id = ?",
+            (self.server, username, upload_id)
+        )
+        if not rows:
+            return None
+        upload = dict(rows[0])
+        for field in HISTORY_JSON_FIELDS:
+            upload[field] = json.loads(upload[field] or '{}')
+        return upload
+
+    def has_history(self, username):
+        return bool(self._query(
+            "SELECT 1 FROM uploads WHERE server = ? AND username = ? LIMIT 1",
+            (self.server, username)
+        ))
+
+    def last_sync(self, username):
+        rows = self._query(
+            "SELECT last_id, synced_at FROM sync_state WHERE server = ? AND username = ?",
+            (self.server, username)
+        )
+        return (rows[0]['last_id'], rows[0]['synced_at']) if rows else (None, None)
+
+    def store(self, username, uploads, db=None):
+        """Insert or refresh uploads as returned by the API."""
+        rows = [
+            (self.server, username, upload['id'], upload['file_name'], upload.get('uploaded_at'),
+             upload.get('total_records'), upload.get('avg_flowrate'), upload.get('avg_pressure'),
+             upload.get('avg_temperature'), json.dumps(upload.get('type_distribution') or {}),
+             json.dumps(upload.get('per_type_stats') or {}))
+            for upload in uploads
+        ]
+        own = db is None
+        db = self._connect() if own else db
+        try:
+            db.executemany(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            if own:
+                db.commit()
+        finally:
+            if own:
+                db.close()
+
+    def sync(self, api, username):
+        """Fetch the uploads created since the last sync; returns how many."""
+        since_id, _ = self.last_sync(username)
+        params = {'fields': ','.join(HISTORY_FIELDS), 'limit': HISTORY_PAGE_SIZE}
+        if since_id is not None:
+            params['since_id'] = since_id
+
+        fetched = []
+        while True:
+            response = api.get('uploads/', params=params)
+            if not response.ok:
+                raise ApiError(error_message(response, 'Could not load the upload history'))
+            page = response.json()
+            fetched.extend(page['results'])
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+
+        # All pages or nothing, so the watermark never skips uploads
+        last_id = max([u['id'] for u in fetched] + [since_id or 0])
+        db = self._connect()
+        try:
+            with db:
+                self.store(username, fetched, db)
+                db.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)",
+                    (self.server, username, last_id, datetime.now().isoformat(timespec='seconds'))
+                )
+        finally:
+            db.close()
+        return len(fetched)
+
+
+# -----------------------------
+# BACKGROUND REQUESTS
+# -----------------------------
+class TaskCancelled(Exception):
+    """Raised inside a background task once the user cancelled it."""
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+    # stage, done, total (total 0 means the amount of work is unknown)
+    progress = pyqtSignal(str, int, int)
+    cancelled = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """
+    Runs ``task(worker)`` on a QThreadPool thread so network calls never
+    block the GUI. The result, an error message or the cancellation comes
+    back through ``worker.signals`` and is delivered on the GUI thread.
+    Long tasks call ``worker.report()`` as they go, which raises
+    ``TaskCancelled`` once ``cancel()`` was called.
+    """
+
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def report(self, stage, done=0, total=0):
+        if self.is_cancelled():
+            raise TaskCancelled()
+        self.signals.progress.emit(stage, done, total)
+
+    def run(self):
+        try:
+            result = self.task(self)
+        except TaskCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            # A request that completed after Cancel was pressed is dropped
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.finished.emit(result)
+
 
 class LoginWindow(QWidget):
     def __init__(self, parent=None):
@@ -63,7 +581,7 @@ class LoginWindow(QWidget):
         layout.addWidget(self.error_label)
         
         # Login button
-        login_btn = QPushButton("Login")
+        self.login_btn = login_btn = QPushButton("Login")
         login_btn.setMinimumHeight(40)
         login_btn.setStyleSheet("""
             QPushButton {
@@ -98,6 +616,22 @@ class LoginWindow(QWidget):
         register_btn.clicked.connect(self.switch_to_register)
         layout.addWidget(register_btn)
         
+        # Saved history, without the server
+        offline_btn = QPushButton("Server unreachable? Browse saved history offline")
+        offline_btn.setStyleSheet("""
+            QPushButton {
+                background: none;
+                border: none;
+                color: #6B7280;
+                text-decoration: underline;
+            }
+            QPushButton:hover {
+                color: #374151;
+            }
+        """)
+        offline_btn.clicked.connect(self.browse_offline)
+        layout.addWidget(offline_btn)
+        
         layout.addStretch()
         
         self.setLayout(layout)
@@ -110,21 +644,38 @@ class LoginWindow(QWidget):
             self.show_error("Please enter username and password")
             return
         
-        try:
-            response = requests.post(
-                f"{API_BASE_URL}/login/",
+        self.error_label.hide()
+        self.login_btn.setEnabled(False)
+        self.parent.run_in_background(
+            lambda worker: self.parent.api.post(
+                "login/",
                 json={"username": username, "password": password}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.parent.set_token(data.get('token'))
-                self.parent.show_dashboard(data.get('last_uploads', []))
-            else:
-                error_data = response.json()
-                self.show_error(error_data.get('error', 'Login failed'))
-        except Exception as e:
-            self.show_error(f"Connection error: {str(e)}")
+            ),
+            self.on_response,
+            self.on_error,
+        )
+    
+    def on_response(self, response):
+        self.login_btn.setEnabled(True)
+        if response.ok:
+            data = response.json()
+            self.parent.set_token(data.get('token'), self.username_input.text().strip())
+            self.parent.show_dashboard(data.get('last_uploads', []))
+        else:
+            self.show_error(error_message(response, 'Login failed'))
+    
+    def on_error(self, message):
+        self.login_btn.setEnabled(True)
+        self.show_error(f"Connection error: {message}")
+    
+    def browse_offline(self):
+        username = self.username_input.text().strip()
+        if not username:
+            self.show_error("Enter your username to browse its saved history")
+        elif not self.parent.history.has_history(username):
+            self.show_error("No saved upload history for this user on this computer")
+        else:
+            self.parent.show_offline(username)
     
     def show_error(self, message):
         self.error_label.setText(message)
@@ -180,7 +731,7 @@ class RegisterWindow(QWidget):
         layout.addWidget(self.error_label)
         
         # Register button
-        register_btn = QPushButton("Register")
+        self.register_btn = register_btn = QPushButton("Register")
         register_btn.setMinimumHeight(40)
         register_btn.setStyleSheet("""
             QPushButton {
@@ -227,21 +778,30 @@ class RegisterWindow(QWidget):
             self.show_error("Please enter username and password")
             return
         
-        try:
-            response = requests.post(
-                f"{API_BASE_URL}/register/",
+        self.error_label.hide()
+        self.register_btn.setEnabled(False)
+        self.parent.run_in_background(
+            lambda worker: self.parent.api.post(
+                "register/",
                 json={"username": username, "password": password}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.parent.set_token(data.get('token'))
-                self.parent.show_dashboard([])
-            else:
-                error_data = response.json()
-                self.show_error(error_data.get('error', 'Registration failed'))
-        except Exception as e:
-            self.show_error(f"Connection error: {str(e)}")
+            ),
+            self.on_response,
+            self.on_error,
+        )
+    
+    def on_response(self, response):
+        self.register_btn.setEnabled(True)
+        # The API answers 201 Created
+        if response.ok:
+            data = response.json()
+            self.parent.set_token(data.get('token'), self.username_input.text().strip())
+            self.parent.show_dashboard([])
+        else:
+            self.show_error(error_message(response, 'Registration failed'))
+    
+    def on_error(self, message):
+        self.register_btn.setEnabled(True)
+        self.show_error(f"Connection error: {message}")
     
     def show_error(self, message):
         self.error_label.setText(message)
@@ -561,16 +1121,28 @@ class FileDetailWidget(QWidget):
 
 
 class DashboardWindow(QWidget):
-    def __init__(self, parent=None, initial_uploads=None):
+    def __init__(self, parent=None, initial_uploads=None, offline=False):
         super().__init__(parent)
         self.parent = parent
-        self.uploads = initial_uploads or []
+        self.history = parent.history
+        self.username = parent.username
+        self.offline = offline
+        self.uploads = []
         self.selected_file = None
+        self.upload_worker = None
+        self.upload_key = None
+        # Unfinished resumable uploads, resumed by uploading the same file again
+        self.resumable_uploads = {}
         self.init_ui()
         
-        # Load initial uploads
-        if self.uploads:
-            self.update_upload_list()
+        # The saved history shows at once, then only new uploads are fetched
+        if initial_uploads:
+            self.history.store(self.username, initial_uploads)
+        self.update_upload_list()
+        if offline:
+            self.set_sync_status("Offline")
+        else:
+            self.sync_history()
     
     def init_ui(self):
         main_layout = QHBoxLayout()
@@ -583,11 +1155,16 @@ class DashboardWindow(QWidget):
         sidebar.setStyleSheet("background-color: #1F2937; color: white;")
         sidebar_layout = QVBoxLayout(sidebar)
         
-        sidebar_title = QLabel("Recent Uploads")
+        sidebar_title = QLabel("Upload History")
         sidebar_title.setFont(QFont("Arial", 16, QFont.Bold))
         sidebar_title.setStyleSheet("padding: 15px; color: white;")
         sidebar_layout.addWidget(sidebar_title)
         
+        self.sync_label = QLabel("")
+        self.sync_label.setStyleSheet("padding: 0 15px; color: #9CA3AF; font-size: 11px;")
+        self.sync_label.setWordWrap(True)
+        sidebar_layout.addWidget(self.sync_label)
+        
         self.upload_list = QListWidget()
         self.upload_list.setStyleSheet("""
             QListWidget {
@@ -632,7 +1209,7 @@ class DashboardWindow(QWidget):
         
         header_layout.addStretch()
         
-        logout_btn = QPushButton("Logout")
+        logout_btn = QPushButton("Back to Login" if self.offline else "Logout")
         logout_btn.setStyleSheet("""
             QPushButton {
                 background-color: #EF4444;
@@ -660,8 +1237,9 @@ class DashboardWindow(QWidget):
         scroll_layout = QVBoxLayout(scroll_content)
         scroll_layout.setContentsMargins(20, 20, 20, 20)
         
-        # Upload CSV section
+        # Upload CSV section (needs the server)
         upload_frame = QFrame()
+        upload_frame.setVisible(not self.offline)
         upload_frame.setStyleSheet("background-color: white; border-radius: 5px; padding: 20px;")
         upload_layout = QVBoxLayout(upload_frame)
         
@@ -675,7 +1253,7 @@ class DashboardWindow(QWidget):
         
         btn_layout = QHBoxLayout()
         
-        select_file_btn = QPushButton("Select File")
+        self.select_file_btn = select_file_btn = QPushButton("Select File")
         select_file_btn.setStyleSheet("""
             QPushButton {
                 background-color: #6B7280;
@@ -713,9 +1291,44 @@ class DashboardWindow(QWidget):
         self.upload_btn.clicked.connect(self.upload_file)
         btn_layout.addWidget(self.upload_btn)
         
+        # gzip the file while sending it (CSV usually shrinks ~10x)
+        self.compress_checkbox = QCheckBox("Compress before upload")
+        self.compress_checkbox.setChecked(True)
+        btn_layout.addWidget(self.compress_checkbox)
+        
         btn_layout.addStretch()
         
         upload_layout.addLayout(btn_layout)
+        
+        # Progress of the running upload, hidden while idle
+        progress_layout = QHBoxLayout()
+        
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        progress_layout.addWidget(self.progress_bar)
+        
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #EF4444;
+                color: white;
+                border: none;
+                border-radius: 5px;
+                padding: 6px 14px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #DC2626;
+            }
+        """)
+        self.cancel_btn.clicked.connect(self.cancel_upload)
+        progress_layout.addWidget(self.cancel_btn)
+        
+        self.progress_label = QLabel("")
+        self.progress_label.setStyleSheet("color: gray;")
+        
+        upload_layout.addLayout(progress_layout)
+        upload_layout.addWidget(self.progress_label)
         scroll_layout.addWidget(upload_frame)
         
         # File detail section
@@ -732,10 +1345,12 @@ class DashboardWindow(QWidget):
         self.setLayout(main_layout)
         
         self.selected_file_path = None
+        self.set_uploading(False)
     
     def select_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select CSV File", "", "CSV Files (*.csv)"
+            self, "Select CSV File", "",
+            "CSV Files (*.csv *.csv.gz *.csv.bz2 *.csv.zst);;All Files (*)"
         )
         if file_path:
             self.selected_file_path = file_path
@@ -743,56 +1358,146 @@ class DashboardWindow(QWidget):
             self.upload_btn.setEnabled(True)
     
     def upload_file(self):
-        if not self.selected_file_path:
+        if not self.selected_file_path or self.upload_worker is not None:
             return
         
-        try:
-            with open(self.selected_file_path, 'rb') as f:
-                files = {'file': f}
-                headers = {'Authorization': f'Token {self.parent.token}'}
-                response = requests.post(
-                    f"{API_BASE_URL}/upload_csv/",
-                    files=files,
-                    headers=headers
-                )
+        path = self.selected_file_path
+        compress = self.compress_checkbox.isChecked() and not is_compressed(path)
+        api = self.parent.api
+        
+        if os.path.getsize(path) >= RESUMABLE_MIN_BYTES:
+            stat = os.stat(path)
+            key = (path, stat.st_size, stat.st_mtime, compress)
+            resumable = self.resumable_uploads.setdefault(key, ResumableUpload(api, path, compress))
+            self.upload_key = key
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Create new upload entry
-                new_upload = {
-                    'id': len(self.uploads) + 1,
-                    'file_name': self.selected_file_path.split('/')[-1],
-                    'uploaded_at': datetime.now().isoformat(),
-                    'total_records': data['overall_stats']['total_records'],
-                    'avg_flowrate': data['overall_stats']['avg_flowrate'],
-                    'avg_pressure': data['overall_stats']['avg_pressure'],
-                    'avg_temperature': data['overall_stats']['avg_temperature'],
-                    'type_distribution': data['overall_stats']['type_distribution'],
-                    'per_type_stats': data['per_type_stats'],
-                }
-                
-                self.uploads.insert(0, new_upload)
-                self.uploads = self.uploads[:5]  # Keep only last 5
-                self.update_upload_list()
-                
-                # Select the new upload
-                self.upload_list.setCurrentRow(0)
-                self.on_file_selected(self.upload_list.item(0))
-                
-                # Reset upload UI
-                self.selected_file_path = None
-                self.file_label.setText("No file selected")
-                self.upload_btn.setEnabled(False)
-                
-                QMessageBox.information(self, "Success", "File uploaded successfully!")
-            else:
-                error_data = response.json()
-                QMessageBox.warning(self, "Error", error_data.get('error', 'Upload failed'))
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Upload error: {str(e)}")
+            def task(worker):
+                return resumable.run(worker.report)
+        else:
+            self.upload_key = None
+            
+            # Runs on a pool thread: no widget access in here
+            def task(worker):
+                body = MultipartEncoder(path, compress=compress, progress=worker.report)
+                response = api.post(
+                    "upload_csv/",
+                    data=body,
+                    headers={'Content-Type': body.content_type},
+                    timeout=UPLOAD_TIMEOUT
+                )
+                if not response.ok:
+                    raise ApiError(error_message(response, 'Upload failed'))
+                return response.json()
+        
+        self.set_uploading(True)
+        self.upload_worker = self.parent.run_in_background(
+            task,
+            self.on_upload_finished,
+            self.on_upload_error,
+            on_progress=self.on_upload_progress,
+            on_cancelled=self.on_upload_cancelled,
+        )
+    
+    def cancel_upload(self):
+        if self.upload_worker is not None:
+            self.upload_worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.progress_label.setText("Cancelling...")
+    
+    def set_uploading(self, uploading):
+        self.select_file_btn.setEnabled(not uploading)
+        self.upload_btn.setEnabled(not uploading and self.selected_file_path is not None)
+        self.compress_checkbox.setEnabled(not uploading)
+        self.cancel_btn.setEnabled(uploading)
+        self.progress_bar.setVisible(uploading)
+        self.cancel_btn.setVisible(uploading)
+        self.progress_label.setVisible(uploading)
+        if uploading:
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+            self.progress_label.setText("Starting...")
+        else:
+            self.upload_worker = None
+    
+    def on_upload_progress(self, stage, done, total):
+        if total > 0:
+            # Percent, since QProgressBar values are 32-bit ints
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(int(done * 100 / total))
+            self.progress_label.setText(f"{stage}: {done / 1e6:.1f} of {total / 1e6:.1f} MB")
+        else:
+            self.progress_bar.setRange(0, 0)  # busy indicator
+            self.progress_label.setText(f"{stage}...")
+    
+    def on_upload_cancelled(self):
+        self.resumable_uploads.pop(self.upload_key, None)
+        self.set_uploading(False)
+        self.file_label.setText(f"Selected: {os.path.basename(self.selected_file_path)} (upload cancelled)")
+    
+    def on_upload_error(self, message):
+        self.set_uploading(False)
+        resumable = self.resumable_uploads.get(self.upload_key)
+        if resumable is not None and resumable.session_id is not None:
+            message += "\n\nUpload the same file again to resume."
+        QMessageBox.critical(self, "Error", f"Upload error: {message}")
+    
+    def on_upload_finished(self, data):
+        self.resumable_uploads.pop(self.upload_key, None)
+        self.set_uploading(False)
+        
+        # The created upload, as the history endpoint returns it
+        self.history.store(self.username, [data['data']])
+        self.update_upload_list()
+        
+        # Select the new upload
+        self.select_upload(data['data']['id'])
+        
+        # Reset upload UI
+        self.selected_file_path = None
+        self.file_label.setText("No file selected")
+        self.upload_btn.setEnabled(False)
+        
+        QMessageBox.information(self, "Success", "File uploaded successfully!")
+    
+    def sync_history(self):
+        _, synced_at = self.history.last_sync(self.username)
+        self.set_sync_status("Syncing...", synced_at)
+        history, api, username = self.history, self.parent.api, self.username
+        self.parent.run_in_background(
+            lambda worker: history.sync(api, username),
+            self.on_sync_finished,
+            self.on_sync_error,
+        )
+    
+    def on_sync_finished(self, count):
+        selected = self.selected_file['id'] if self.selected_file else None
+        if count:
+            self.update_upload_list()
+            if selected is not None:
+                self.select_upload(selected, show=False)
+        _, synced_at = self.history.last_sync(self.username)
+        self.set_sync_status("Up to date", synced_at)
+    
+    def on_sync_error(self, message):
+        _, synced_at = self.history.last_sync(self.username)
+        self.set_sync_status(f"Could not sync ({message})", synced_at)
+    
+    def set_sync_status(self, status, synced_at=None):
+        if synced_at:
+            status += f" - last synced {synced_at.replace('T', ' ')}"
+        self.sync_label.setText(status)
+    
+    def select_upload(self, upload_id, show=True):
+        for row in range(self.upload_list.count()):
+            item = self.upload_list.item(row)
+            if item.data(Qt.UserRole)['id'] == upload_id:
+                self.upload_list.setCurrentRow(row)
+                if show:
+                    self.on_file_selected(item)
+                return
     
     def update_upload_list(self):
+        self.uploads = self.history.uploads(self.username)
         self.upload_list.clear()
         for upload in self.uploads:
             item = QListWidgetItem(upload['file_name'])
@@ -804,11 +1509,15 @@ class DashboardWindow(QWidget):
             self.upload_list.addItem(item)
     
     def on_file_selected(self, item):
-        file_data = item.data(Qt.UserRole)
+        # The list holds summaries; the per-type stats come from the cache
+        file_data = self.history.get(self.username, item.data(Qt.UserRole)['id'])
+        if file_data is None:
+            return
         self.selected_file = file_data
         self.file_detail.display_file_data(file_data)
     
     def handle_logout(self):
+        self.cancel_upload()
         self.parent.logout()
 
 
@@ -816,6 +1525,12 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.token = None
+        self.username = None
+        self.api = ApiClient()
+        self.history = HistoryCache()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(API_POOL_SIZE)
+        self.workers = set()
         self.init_ui()
         self.setWindowTitle("Chemical Equipment Parameter Visualizer")
         
@@ -844,8 +1559,28 @@ class MainWindow(QMainWindow):
         # Show login page
         self.show_login()
     
-    def set_token(self, token):
+    def set_token(self, token, username=None):
         self.token = token
+        self.username = username
+        self.api.set_token(token)
+    
+    def run_in_background(self, task, on_finished, on_error, on_progress=None, on_cancelled=None):
+        """Run ``task(worker)`` on the thread pool; the callbacks run on the GUI thread."""
+        worker = Worker(task)
+        worker.signals.finished.connect(on_finished)
+        worker.signals.error.connect(on_error)
+        if on_progress is not None:
+            worker.signals.progress.connect(on_progress)
+        if on_cancelled is not None:
+            worker.signals.cancelled.connect(on_cancelled)
+        
+        # Keep the Python objects alive until the task is over
+        self.workers.add(worker)
+        for signal in (worker.signals.finished, worker.signals.error, worker.signals.cancelled):
+            signal.connect(lambda *args, w=worker: self.workers.discard(w))
+        
+        self.thread_pool.start(worker)
+        return worker
     
     def show_login(self):
         self.stack.setCurrentWidget(self.login_page)
@@ -853,7 +1588,12 @@ class MainWindow(QMainWindow):
     def show_register(self):
         self.stack.setCurrentWidget(self.register_page)
     
-    def show_dashboard(self, initial_uploads):
+    def show_offline(self, username):
+        """Browse the saved history of ``username`` without the server."""
+        self.set_token(None, username)
+        self.show_dashboard([], offline=True)
+    
+    def show_dashboard(self, initial_uploads, offline=False):
         # Remove old dashboard if exists
         for i in range(self.stack.count()):
             widget = self.stack.widget(i)
@@ -863,12 +1603,12 @@ class MainWindow(QMainWindow):
                 break
         
         # Create new dashboard
-        self.dashboard_page = DashboardWindow(self, initial_uploads)
+        self.dashboard_page = DashboardWindow(self, initial_uploads, offline)
         self.stack.addWidget(self.dashboard_page)
         self.stack.setCurrentWidget(self.dashboard_page)
     
     def logout(self):
-        self.token = None
+        self.set_token(None)
         
         # Remove dashboard
         for i in range(self.stack.count()):
@@ -884,6 +1624,12 @@ class MainWindow(QMainWindow):
         self.login_page.error_label.hide()
         
         self.show_login()
+    
+    def closeEvent(self, event):
+        for worker in list(self.workers):
+            worker.cancel()
+        self.api.close()
+        super().closeEvent(event)
 
 
 def main():
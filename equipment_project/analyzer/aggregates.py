@@ -0,0 +1,174 @@
+"""
+Mergeable partial aggregates for upload statistics.
+
+A ``PartialAggregate`` keeps, per type and per metric, the count, sum, M2
+(sum of squared deviations from the mean), min and max. Two partials over
+disjoint rows merge exactly with Chan's parallel variance formula, so
+chunks, files and uploads can be combined without rereading any CSV.
+"""
+import numpy as np
+import pandas as pd
+
+from .stats import METRICS, empty_stats, group_stats, upload_stats
+
+PARTS = ("sum", "m2", "min", "max")
+FORMAT_VERSION = 1
+
+
+def _columns(metrics):
+    return ["count"] + [f"{m}_{p}" for m in metrics for p in PARTS]
+
+
+class PartialAggregate:
+    def __init__(self, frame=None, metrics=METRICS):
+        self.metrics = tuple(metrics)
+        if frame is None:
+            frame = pd.DataFrame(
+                {col: pd.Series(dtype="float64") for col in _columns(self.metrics)},
+                index=pd.Index([], name="type"),
+            )
+        self.frame = frame
+
+    def __repr__(self):
+        return f"<PartialAggregate types={len(self.frame)} rows={self.count}>"
+
+    @property
+    def count(self):
+        return int(self.frame["count"].sum())
+
+    # -------------------------------
+    # CONSTRUCTION
+    # -------------------------------
+    @classmethod
+    def from_groups(cls, groups, metrics=METRICS):
+        """Build from a ``stats.group_stats`` frame."""
+        count = groups["count"].astype("float64")
+        data = {"count": count}
+        for m in metrics:
+            data[f"{m}_sum"] = groups[f"{m}_mean"] * count
+            data[f"{m}_m2"] = (groups[f"{m}_var"] * (count - 1)).fillna(0.0)
+            data[f"{m}_min"] = groups[f"{m}_min"]
+            data[f"{m}_max"] = groups[f"{m}_max"]
+        frame = pd.DataFrame(data, index=groups.index)
+        frame.index.name = "type"
+        return cls(frame, metrics)
+
+    @classmethod
+    def from_codes(cls, codes, categories, values, metrics=METRICS):
+        """
+        Aggregate NumPy arrays grouped by dictionary codes.
+
+        ``codes`` index into ``categories`` and ``values`` maps each metric
+        to an array aligned with ``codes``. Types with no rows are dropped.
+        """
+        codes = np.asarray(codes, dtype="intp")
+        k = len(categories)
+        count = np.bincount(codes, minlength=k).astype("float64")
+        present = count > 0
+
+        data = {"count": count}
+        for m in metrics:
+            x = np.asarray(values[m], dtype="float64")
+            total = np.bincount(codes, weights=x, minlength=k)
+            mean = np.divide(total, count, out=np.zeros(k), where=present)
+            lo = np.full(k, np.inf)
+            hi = np.full(k, -np.inf)
+            np.minimum.at(lo, codes, x)
+            np.maximum.at(hi, codes, x)
+            data[f"{m}_sum"] = total
+            data[f"{m}_m2"] = np.bincount(codes, weights=(x - mean[codes]) ** 2, minlength=k)
+            data[f"{m}_min"] = lo
+            data[f"{m}_max"] = hi
+
+        frame = pd.DataFrame(data, index=pd.Index(categories, name="type"))
+        return cls(frame[present], metrics)
+
+    @classmethod
+    def from_frame(cls, df, metrics=METRICS):
+        """Aggregate a cleaned frame with ``type`` and metric columns."""
+        return cls.from_groups(group_stats(df, metrics), metrics)
+
+    # -------------------------------
+    # MERGING
+    # -------------------------------
+    def merge(self, other):
+        return self.merge_all([self, other])
+
+    @classmethod
+    def merge_all(cls, partials):
+        """Merge any number of partials in one vectorized pass."""
+        partials = list(partials)
+        if not partials:
+            return cls()
+        metrics = partials[0].metrics
+        frames = [p.frame for p in partials if not p.frame.empty]
+        if len(frames) <= 1:
+            return cls(frames[0] if frames else None, metrics)
+
+        stacked = pd.concat(frames)
+        by = stacked.index
+        count = stacked["count"]
+        n = count.groupby(by).sum()
+
+        data = {"count": n}
+        for m in metrics:
+            total = stacked[f"{m}_sum"]
+            pooled_sum = total.groupby(by).sum()
+            # M2 = sum(M2_i) + sum(n_i * (mean_i - mean)^2)
+            delta = total / count - (pooled_sum / n).reindex(by).to_numpy()
+            data[f"{m}_sum"] = pooled_sum
+            data[f"{m}_m2"] = (stacked[f"{m}_m2"] + count * delta ** 2).groupby(by).sum()
+            data[f"{m}_min"] = stacked[f"{m}_min"].groupby(by).min()
+            data[f"{m}_max"] = stacked[f"{m}_max"].groupby(by).max()
+
+        frame = pd.DataFrame(data)
+        frame.index.name = "type"
+        return cls(frame, metrics)
+
+    # -------------------------------
+    # DERIVED STATS
+    # -------------------------------
+    def groups(self):
+        """The ``stats.group_stats`` representation (mean/var instead of sum/M2)."""
+        if self.frame.empty:
+            return empty_stats(self.metrics)
+        count = self.frame["count"]
+        data = {"count": count}
+        for m in self.metrics:
+            data[f"{m}_mean"] = self.frame[f"{m}_sum"] / count
+            data[f"{m}_min"] = self.frame[f"{m}_min"]
+            data[f"{m}_max"] = self.frame[f"{m}_max"]
+            data[f"{m}_var"] = self.frame[f"{m}_m2"] / (count - 1)
+        return pd.DataFrame(data, index=self.frame.index)
+
+    def upload_fields(self):
+        """Field values for an ``Upload`` built from this aggregate."""
+        return {**upload_stats(self.groups(), self.metrics), "aggregate": self.to_dict()}
+
+    # -------------------------------
+    # SERIALIZATION
+    # -------------------------------
+    def to_dict(self):
+        """Compact, JSON-serializable columnar form."""
+        frame = self.frame
+        data = {
+            "version": FORMAT_VERSION,
+            "metrics": list(self.metrics),
+            "types": [str(t) for t in frame.index],
+            "count": frame["count"].astype("int64").tolist(),
+        }
+        for m in self.metrics:
+            data[m] = {p: frame[f"{m}_{p}"].astype("float64").tolist() for p in PARTS}
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        metrics = tuple(data["metrics"])
+        columns = {"count": np.asarray(data["count"], dtype="float64")}
+        for m in metrics:
+            for p in PARTS:
+                columns[f"{m}_{p}"] = np.asarray(data[m][p], dtype="float64")
+        frame = pd.DataFrame(columns, index=pd.Index(data["types"], name="type"))
+        return cls(frame, metrics)
@@ -0,0 +1,79 @@
+"""
+Re-analysis of stored upload datasets.
+
+Filters are pushed down to the columnar store: parts whose min/max or type
+dictionary cannot match are skipped without being read, and only the type
+column, the filtered columns and the requested metrics are memory-mapped.
+"""
+import numpy as np
+
+from .aggregates import PartialAggregate
+from .stats import METRICS
+
+# Rows are filtered and aggregated in blocks so memory stays bounded even
+# for a single multi-GB part.
+BLOCK_ROWS = 1_000_000
+
+
+def _part_can_match(part, ranges):
+    for metric, (lo, hi) in ranges.items():
+        bounds = part.ranges.get(metric)
+        if bounds is None:
+            return False
+        if lo is not None and bounds[1] < lo:
+            return False
+        if hi is not None and bounds[0] > hi:
+            return False
+    return True
+
+
+def analyze_dataset(dataset, types=None, ranges=None, metrics=METRICS, block_rows=BLOCK_ROWS):
+    """
+    Aggregate the rows of ``dataset`` that match the filters.
+
+    ``types`` restricts the equipment types, ``ranges`` maps a metric to an
+    inclusive ``(min, max)`` pair where either end may be None.
+    """
+    ranges = ranges or {}
+    wanted = set(types) if types else None
+    partials = []
+
+    for part in dataset.parts():
+        if not part.rows or not _part_can_match(part, ranges):
+            continue
+
+        categories = part.categories("type")
+        keep_codes = None
+        if wanted is not None:
+            keep_codes = np.array([i for i, t in enumerate(categories) if t in wanted], dtype="<i4")
+            if not len(keep_codes):
+                continue
+
+        type_codes = part.column("type")
+        columns = {name: part.column(name) for name in set(metrics) | set(ranges)}
+
+        for start in range(0, part.rows, block_rows):
+            stop = start + block_rows
+            codes = type_codes[start:stop]
+            mask = np.ones(len(codes), dtype=bool)
+            if keep_codes is not None:
+                mask &= np.isin(codes, keep_codes)
+            for metric, (lo, hi) in ranges.items():
+                values = columns[metric][start:stop]
+                if lo is not None:
+                    mask &= values >= lo
+                if hi is not None:
+                    mask &= values <= hi
+            if not mask.any():
+                continue
+
+            partials.append(PartialAggregate.from_codes(
+                codes[mask],
+                categories,
+                {m: columns[m][start:stop][mask] for m in metrics},
+                metrics,
+            ))
+
+    if not partials:
+        return PartialAggregate(metrics=metrics)
+    return PartialAggregate.merge_all(partials)
@@ -0,0 +1,225 @@
+"""
+Bulk uploads: many CSV files, or ZIP archives of CSV files, in one request.
+
+Every member is written to a temporary file and ingested in the process
+pool, one file per worker. Members whose bytes were seen before (in the
+user's uploads or earlier in the same batch) reuse those results. All
+``Upload`` rows are then created with a single ``bulk_create`` in one
+transaction, together with their rollups. A member that cannot be
+extracted or parsed is reported in the results and does not affect the
+others.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+from collections import defaultdict
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .aggregates import PartialAggregate
+from .caching import invalidate_upload
+from .ingest import IngestError
+from .models import Upload
+from .parallel import WorkerCrashed, discard_pool, get_pool, ingest_file, pool_guard
+from .rollups import record_upload
+from .services import alias_index, cloned_fields, file_digest, find_duplicate, local_path
+from .storage import delete_dataset, new_dataset_path
+from .uploadhandlers import upload_temp_dir
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_FILES = 500
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.bz2", ".csv.zst")
+# Guards against archives that expand far beyond their upload size
+MAX_EXTRACTED_BYTES = 4 * 1024 ** 3
+# Corrupt (bad CRC, truncated), encrypted or unsupported archive members
+ZIP_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+
+class BulkResult:
+    """Outcome of one member of a bulk upload."""
+
+    def __init__(self, file_name, upload=None, cached=False, error=None):
+        self.file_name = file_name
+        self.upload = upload
+        self.cached = cached
+        self.error = error
+
+
+def _file_name(name):
+    return name if len(name) <= 255 else name[-255:]
+
+
+def collect_members(files, workdir):
+    """
+    ``(file_name, path, content_hash, error)`` of every CSV in ``files``;
+    ZIP archives are extracted into ``workdir``, other files are used in
+    place when on disk. ``content_hash`` is None when it is not known yet,
+    ``error`` is set (and ``path`` None) for members that could not be read.
+    """
+    members = []
+    extracted = 0
+
+    def add(name, path, content_hash=None, error=None):
+        if len(members) >= MAX_BULK_FILES:
+            raise IngestError(f"At most {MAX_BULK_FILES} files per bulk upload")
+        members.append((_file_name(name), path, content_hash, error))
+
+    for f in files:
+        if zipfile.is_zipfile(f):
+            f.seek(0)
+            try:
+                archive = zipfile.ZipFile(f)
+            except ZIP_ERRORS as exc:
+                add(f.name, None, error=f"Could not read archive: {exc}")
+                continue
+            with archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    if info.is_dir() or name.startswith("__MACOSX/"):
+                        continue
+                    if not name.lower().endswith(CSV_SUFFIXES):
+                        continue
+                    extracted += info.file_size
+                    if extracted > MAX_EXTRACTED_BYTES:
+                        raise IngestError(f"Archive '{f.name}' is too large to extract")
+                    path = os.path.join(workdir, f"{len(members):05d}.csv")
+                    try:
+                        with archive.open(info) as src, open(path, "wb") as dst:
+                            shutil.copyfileobj(src, dst, 1 << 20)
+                    except ZIP_ERRORS as exc:
+                        add(f"{f.name}/{name}", None, error=f"Could not extract file: {exc}")
+                        continue
+                    add(f"{f.name}/{name}", path)
+            continue
+
+        f.seek(0)
+        path = local_path(f)
+        if path is None:
+            path = os.path.join(workdir, f"{len(members):05d}.csv")
+            with open(path, "wb") as dst:
+                for chunk in f.chunks():
+                    dst.write(chunk)
+        add(f.name, path, getattr(f, "content_hash", None))
+
+    return members
+
+
+def process_bulk(user, files):
+    """Ingest every CSV in ``files`` for ``user``; returns ``BulkResult``s in order."""
+    datasets = []
+    try:
+        return _process_bulk(user, files, datasets)
+    except BaseException:
+        # Nothing was stored, so no upload refers to these
+        for dataset in datasets:
+            delete_dataset(settings.MEDIA_ROOT, dataset)
+        raise
+
+
+def _ingest_error(future):
+    """The user facing error of a finished ingest future, or None."""
+    try:
+        future.result()
+    except IngestError as exc:
+        return str(exc)
+    except Exception:
+        logger.exception("Bulk ingest of a file failed")
+        return "Internal error while processing the file"
+    return None
+
+
+def _process_bulk(user, files, datasets):
+    with tempfile.TemporaryDirectory(dir=upload_temp_dir()) as workdir:
+        members = collect_members(files, workdir)
+        hashes = []
+        for _, path, content_hash, error in members:
+            if content_hash is None and error is None:
+                with open(path, "rb") as f:
+                    content_hash = file_digest(f)
+            hashes.append(content_hash)
+
+        known = {}
+        if settings.UPLOAD_DEDUP_CACHE:
+            for content_hash in set(hashes) - {None}:
+                source = find_duplicate(user, content_hash)
+                if source is not None:
+                    known[content_hash] = source
+
+        # One ingest per distinct new content
+        pool = get_pool(settings.INGEST_PROCESSES, name="ingest")
+        aliases = alias_index()
+        futures = {}
+        try:
+            with pool_guard(pool, "ingest"):
+                for (_, path, _, error), content_hash in zip(members, hashes):
+                    if error is not None or content_hash in known or content_hash in futures:
+                        continue
+                    dataset = new_dataset_path() if settings.PERSIST_DATASETS else ""
+                    if dataset:
+                        datasets.append(dataset)
+                    futures[content_hash] = (dataset, pool.submit(
+                        ingest_file, path, settings.CSV_CHUNK_SIZE,
+                        os.path.join(settings.MEDIA_ROOT, dataset) if dataset else None,
+                        settings.MAX_DECOMPRESSED_SIZE, settings.CSV_PARSER, aliases,
+                    ))
+        except WorkerCrashed as exc:
+            for _, future in futures.values():
+                future.cancel()
+            raise IngestError(str(exc))
+
+        parsed, errors = {}, {}
+        for content_hash, (dataset, future) in futures.items():
+            error = _ingest_error(future)
+            if error is None:
+                parsed[content_hash] = (future.result(), dataset)
+                continue
+            errors[content_hash] = error
+            if dataset:
+                delete_dataset(settings.MEDIA_ROOT, dataset)
+            if isinstance(future.exception(), BrokenProcessPool):
+                discard_pool(pool, name="ingest")
+
+    results, rows, aggregates = [], [], []
+    first_seen = set()
+    for (file_name, _, _, error), content_hash in zip(members, hashes):
+        error = error or errors.get(content_hash)
+        if error is not None:
+            results.append(BulkResult(file_name, error=error))
+            continue
+        if content_hash in known:
+            source = known[content_hash]
+            fields = cloned_fields(source)
+            aggregate = PartialAggregate.from_dict(source.aggregate)
+            cached = True
+        else:
+            aggregate, dataset = parsed[content_hash]
+            fields = {"dataset": dataset, "content_hash": content_hash, **aggregate.upload_fields()}
+            cached = content_hash in first_seen
+            first_seen.add(content_hash)
+        rows.append(Upload(user=user, file_name=file_name, **fields))
+        aggregates.append(aggregate)
+        results.append(BulkResult(file_name, upload=rows[-1], cached=cached))
+
+    with transaction.atomic():
+        created = Upload.objects.bulk_create(rows)
+        # One rollup merge per day instead of one per file
+        by_day = defaultdict(list)
+        for upload, aggregate in zip(created, aggregates):
+            by_day[timezone.localdate(upload.uploaded_at)].append((upload, aggregate))
+        for day_uploads in by_day.values():
+            merged = PartialAggregate.merge_all(a for _, a in day_uploads)
+            record_upload(day_uploads[0][0], merged)
+    # Stored now, so no longer ours to clean up
+    datasets.clear()
+
+    # bulk_create sends no post_save signals
+    for upload in created:
+        invalidate_upload(upload)
+    return results
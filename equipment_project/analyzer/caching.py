@@ -0,0 +1,103 @@
+"""
+Response caching and conditional GET for the read endpoints.
+
+ETags are derived from database state so they agree across worker
+processes: uploads never change after creation, so a per-upload ETag only
+needs the upload id (plus the request parameters), and per-user listings
+use the number and highest id of the user's uploads, which change whenever
+an upload is created or deleted. Rollup listings also include the state of
+the rollup rows.
+
+Serialized payloads are stored in the Django cache under the ETag. Signal
+handlers also bump a per-upload / per-user generation on create and delete,
+which immediately orphans the cached payloads in this process.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.response import Response
+
+from .models import TypeRollup, Upload
+
+# Bump when the shape of a cached payload changes
+PAYLOAD_VERSION = 1
+
+
+def _params_hash(params):
+    if not params:
+        return "all"
+    items = sorted((str(k), str(v)) for k, v in params.items())
+    return hashlib.blake2b(repr(items).encode(), digest_size=8).hexdigest()
+
+
+def upload_etag(upload_id, kind, params=None):
+    return quote_etag(f"{kind}-{upload_id}-v{PAYLOAD_VERSION}-{_params_hash(params)}")
+
+
+def user_etag(user, kind, params=None):
+    state = Upload.objects.filter(user=user).aggregate(n=Count("id"), last=Max("id"))
+    version = f"{state['n']}.{state['last'] or 0}"
+    return quote_etag(f"{kind}-u{user.pk}-{version}-v{PAYLOAD_VERSION}-{_params_hash(params)}")
+
+
+def rollup_etag(user, params=None):
+    """Also keyed on the rollup rows, which ``rebuild_rollups`` recreates."""
+    state = TypeRollup.objects.filter(user=user).aggregate(n=Count("id"), last=Max("id"))
+    version = f"{state['n']}.{state['last'] or 0}"
+    return user_etag(user, f"rollups-{version}", params)
+
+
+def _generation(key):
+    return cache.get(key, 0)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_upload(upload):
+    """Drop cached payloads of an upload and of its owner's listings."""
+    _bump(f"analyzer:gen:upload:{upload.pk}")
+    _bump(f"analyzer:gen:user:{upload.user_id}")
+
+
+def not_modified(request, etag):
+    header = request.headers.get("If-None-Match")
+    if not header or request.method not in ("GET", "HEAD"):
+        return False
+    candidates = parse_etags(header)
+    if "*" in candidates:
+        return True
+    strip_weak = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    return strip_weak(etag) in {strip_weak(tag) for tag in candidates}
+
+
+def cached_response(request, etag, build, upload_id=None, user_id=None):
+    """
+    Serve ``build()`` with ``etag``, answering 304 when the client has it.
+
+    The payload is cached per ETag and per upload/user generation.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, etag):
+        return Response(status=304, headers=headers)
+
+    generation = (
+        _generation(f"analyzer:gen:upload:{upload_id}") if upload_id is not None else 0,
+        _generation(f"analyzer:gen:user:{user_id}") if user_id is not None else 0,
+    )
+    key = "analyzer:response:" + hashlib.blake2b(
+        f"{etag}:{generation}".encode(), digest_size=16
+    ).hexdigest()
+
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, settings.RESPONSE_CACHE_TIMEOUT)
+    return Response(payload, headers=headers)
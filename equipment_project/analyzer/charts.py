@@ -0,0 +1,82 @@
+"""
+Chart-ready series for an upload.
+
+Types are sorted by record count and, when there are more than ``top`` of
+them, the tail is folded into a single "Other" entry so clients never have
+to draw (or reshape) thousands of bars. The averages of "Other" are count
+weighted, i.e. the exact mean over all folded rows.
+"""
+import numpy as np
+import pandas as pd
+
+from .aggregates import PartialAggregate
+from .stats import METRICS
+
+DEFAULT_TOP = 20
+MAX_TOP = 1000
+OTHER_LABEL = "Other"
+
+
+def top_param(value):
+    """``top`` query parameter: 1..MAX_TOP, or 0 for every type."""
+    if value in (None, ""):
+        return DEFAULT_TOP
+    try:
+        top = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'top' must be an integer")
+    if top < 0 or top > MAX_TOP:
+        raise ValueError(f"'top' must be between 0 and {MAX_TOP}")
+    return top
+
+
+def _type_frame(upload, metrics):
+    """Per-type ``count`` and ``<metric>_sum`` columns of an upload."""
+    if upload.aggregate:
+        frame = PartialAggregate.from_dict(upload.aggregate).frame
+        return frame[["count"] + [f"{m}_sum" for m in metrics]]
+
+    # Uploads created before aggregates were stored
+    stats = upload.per_type_stats or {}
+    count = pd.Series({t: float(s["count"]) for t, s in stats.items()}, dtype="float64")
+    data = {"count": count}
+    for m in metrics:
+        data[f"{m}_sum"] = pd.Series(
+            {t: s[f"avg_{m}"] * s["count"] for t, s in stats.items()}, dtype="float64"
+        )
+    return pd.DataFrame(data)
+
+
+def chart_series(upload, top=DEFAULT_TOP, metrics=METRICS):
+    """
+    Columnar chart data: ``labels`` plus parallel ``counts`` and per-metric
+    average arrays, largest types first.
+    """
+    frame = _type_frame(upload, metrics)
+    frame = frame.assign(label=frame.index.astype(str))
+    frame = frame.sort_values(["count", "label"], ascending=[False, True], kind="stable")
+    total_types = len(frame)
+
+    other = None
+    if top and len(frame) > top:
+        head, tail = frame.iloc[:top], frame.iloc[top:]
+        folded = tail.drop(columns="label").sum()
+        other = {"types": len(tail), "count": int(folded["count"])}
+        folded["label"] = OTHER_LABEL
+        frame = pd.concat([head, folded.to_frame().T])
+
+    count = frame["count"].to_numpy(dtype="float64")
+    series = {}
+    for m in metrics:
+        total = frame[f"{m}_sum"].to_numpy(dtype="float64")
+        mean = np.divide(total, count, out=np.zeros(len(count)), where=count > 0)
+        series[f"avg_{m}"] = mean.tolist()
+
+    return {
+        "upload_id": upload.pk,
+        "total_types": total_types,
+        "labels": frame["label"].tolist(),
+        "counts": count.astype("int64").tolist(),
+        "series": series,
+        "other": other,
+    }
@@ -0,0 +1,107 @@
+"""
+Transparent decompression of compressed CSV uploads.
+
+The format is detected from the magic bytes, not the file name. The
+decompressed bytes are produced incrementally as the chunked parser reads,
+so the decompressed file never exists in memory or on disk. gzip and bz2
+use the standard library; zstd needs the optional ``zstandard`` package.
+"""
+import bz2
+import gzip
+import io
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error)
+if zstandard is not None:
+    DECOMPRESS_ERRORS += (zstandard.ZstdError,)
+
+
+class DecompressionError(Exception):
+    """Raised for corrupt, truncated or oversized compressed input."""
+
+
+def detect_compression(fileobj):
+    """``"gzip"``, ``"bz2"``, ``"zstd"`` or None for a binary file object."""
+    position = fileobj.tell()
+    head = fileobj.read(4)
+    fileobj.seek(position)
+    for magic, kind in MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _open_stream(fileobj, kind):
+    if kind == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if kind == "bz2":
+        return bz2.BZ2File(fileobj, mode="rb")
+    if zstandard is None:
+        raise DecompressionError("zstd compressed uploads need the 'zstandard' package")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    Readable stream of the decompressed content of ``fileobj``.
+
+    Only rewinding is supported (``seek(0)`` restarts decompression), which
+    is all the CSV header sniffing needs.
+    """
+
+    def __init__(self, fileobj, kind, max_size=None):
+        self.fileobj = fileobj
+        self.kind = kind
+        self.max_size = max_size
+        self._restart()
+
+    def _restart(self):
+        self.fileobj.seek(0)
+        self.stream = _open_stream(self.fileobj, self.kind)
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            n = self.stream.readinto(buffer)
+        except DECOMPRESS_ERRORS as exc:
+            raise DecompressionError(f"Could not decompress {self.kind} upload: {exc}")
+        self.position += n
+        if self.max_size is not None and self.position > self.max_size:
+            raise DecompressionError("Decompressed upload exceeds the maximum size")
+        return n
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET and offset == 0:
+            self._restart()
+            return 0
+        if whence == io.SEEK_CUR and offset == 0:
+            return self.position
+        raise io.UnsupportedOperation("compressed uploads can only be rewound")
+
+    def tell(self):
+        return self.position
+
+
+def decompressed(fileobj, max_size=None):
+    """``fileobj`` itself when it is plain, otherwise a decompressing reader."""
+    kind = detect_compression(fileobj)
+    if kind is None:
+        return fileobj
+    return io.BufferedReader(DecompressingReader(fileobj, kind, max_size), 1 << 20)
@@ -0,0 +1,326 @@
+"""
+Chunked CSV ingestion for equipment uploads.
+
+The upload is read in bounded chunks so peak memory depends on the chunk
+size, not on the size of the file. The column mapping is resolved once
+from the header and every chunk is folded into running per-type totals.
+"""
+import csv
+from collections import deque
+
+import pandas as pd
+from pandas.api.types import is_float_dtype
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:  # optional, faster multithreaded parser
+    pa = None
+
+from .aggregates import PartialAggregate
+from .compression import DecompressionError, decompressed
+from .stats import METRICS
+
+# Flexible column mapping (standard name -> accepted header spellings).
+# Deployments can add spellings with the CSV_COLUMN_ALIASES setting.
+COLUMN_MAP = {
+    "equipment": ["equipment", "equipmentname", "equipment_name"],
+    "type": ["type"],
+    "flowrate": ["flowrate", "flow_rate"],
+    "pressure": ["pressure"],
+    "temperature": ["temperature", "temp"],
+}
+
+DEFAULT_CHUNK_SIZE = 100_000
+MAX_HEADER_BYTES = 64 * 1024
+
+PARSERS = ("c", "pyarrow")
+PARSE_ERRORS = (pd.errors.ParserError, UnicodeDecodeError)
+if pa is not None:
+    PARSE_ERRORS += (pa.ArrowInvalid,)
+
+# pyarrow reads in byte blocks; this turns CSV_CHUNK_SIZE rows into bytes
+ARROW_BYTES_PER_ROW = 64
+
+
+class IngestError(Exception):
+    """Raised when an upload cannot be ingested. The message is user facing."""
+
+
+def normalize_column(name):
+    # Normalize column names (remove spaces, lowercase)
+    return str(name).strip().replace(" ", "").lower()
+
+
+def build_alias_index(extra_aliases=None):
+    """
+    Precompute ``{normalized header: standard name}`` from COLUMN_MAP plus
+    ``extra_aliases`` (same shape as COLUMN_MAP, e.g. the CSV_COLUMN_ALIASES
+    setting), so resolving a header is one dict lookup per column.
+    """
+    index = {}
+    for aliases in (COLUMN_MAP, extra_aliases or {}):
+        for standard, names in aliases.items():
+            if standard not in COLUMN_MAP:
+                raise ValueError(f"Unknown standard column '{standard}' in column aliases")
+            for name in [standard, *names]:
+                key = normalize_column(name)
+                if index.setdefault(key, standard) != standard:
+                    raise ValueError(
+                        f"Column alias '{name}' maps to both '{index[key]}' and '{standard}'"
+                    )
+    return index
+
+
+ALIAS_INDEX = build_alias_index()
+
+
+def resolve_columns(columns, alias_index=ALIAS_INDEX):
+    """Map the real header names to the standard names in COLUMN_MAP."""
+    found = {}
+    for col in columns:
+        standard = alias_index.get(normalize_column(col))
+        if standard is not None and standard not in found:
+            found[standard] = col
+
+    for standard in COLUMN_MAP:
+        if standard not in found:
+            raise IngestError(f"Missing required column '{standard}'")
+
+    return {col: standard for standard, col in found.items()}
+
+
+def _dedupe(names):
+    """Rename repeated header names the way pandas does: x, x.1, x.2, ..."""
+    seen = {}
+    result = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        result.append(name if count == 0 else f"{name}.{count}")
+    return result
+
+
+def skip_header(fileobj):
+    """
+    Read up to the end of the header of a CSV file object and return
+    ``(names, lines)``, ``lines`` being the number of lines read.
+
+    The header is the first line that is not blank, as for pandas.
+    """
+    lines = size = 0
+    while size < MAX_HEADER_BYTES:
+        try:
+            line = fileobj.readline(MAX_HEADER_BYTES - size)
+        except DecompressionError as exc:
+            raise IngestError(str(exc))
+        if not line:
+            break
+        lines += 1
+        size += len(line)
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8-sig")
+            except UnicodeDecodeError as exc:
+                raise IngestError(f"Could not read CSV header: {exc}")
+        if line.strip():
+            return _dedupe(next(csv.reader([line]))), lines
+    raise IngestError("Could not read CSV header: No columns to parse from file")
+
+
+def read_header(fileobj):
+    """
+    Return the header of a CSV file object and rewind it.
+
+    Only the header line (and any blank lines before it) is read, so a file
+    with the wrong columns is rejected without touching its body.
+    """
+    names, _ = skip_header(fileobj)
+    fileobj.seek(0)
+    return names
+
+
+def clean_chunk(chunk):
+    """Drop unusable rows of a chunk that has the standard column names."""
+    # Backends pin float64 up front; only coerce what they could not
+    for metric in METRICS:
+        if not is_float_dtype(chunk[metric]):
+            chunk[metric] = pd.to_numeric(chunk[metric], errors="coerce")
+
+    chunk = chunk.dropna(subset=list(COLUMN_MAP))
+    return chunk.assign(type=chunk["type"].astype(str))
+
+
+# -----------------------------
+# PARSER BACKENDS
+# -----------------------------
+def resolve_parser(name):
+    """
+    The backend for a ``CSV_PARSER`` setting: "auto" means pyarrow when it
+    is installed, and "pyarrow" falls back to the pandas C engine without it.
+    """
+    if name in (None, "auto"):
+        return "pyarrow" if pa is not None else "c"
+    if name not in PARSERS:
+        raise ValueError(f"Unknown CSV parser '{name}', expected one of {', '.join(PARSERS)}")
+    if name == "pyarrow" and pa is None:
+        return "c"
+    return name
+
+
+def _c_chunks(source, column_map, chunksize, names=None):
+    # Text columns are pinned to str so e.g. numeric type codes stay as written
+    options = {
+        "usecols": list(column_map),
+        "dtype": {raw: str for raw, std in column_map.items() if std not in METRICS},
+        "chunksize": chunksize,
+    }
+    if names is not None:
+        options.update(header=None, names=names)
+    with pd.read_csv(source, **options) as reader:
+        for chunk in reader:
+            yield chunk.rename(columns=column_map)
+
+
+def _arrow_float(array):
+    """
+    Cast text to float64. Columns with anything the cast rejects (e.g.
+    padded numbers or words) are left to ``clean_chunk``, which coerces
+    them the way the C engine path does.
+    """
+    try:
+        return pc.cast(array, pa.float64()).to_numpy(zero_copy_only=False)
+    except pa.ArrowInvalid:
+        return array.to_pandas()
+
+
+def _ragged_frame(lines, positions, null_values):
+    """
+    Rows pyarrow rejects for their number of fields, read like the C engine
+    does: missing fields are empty and extra ones are ignored.
+    """
+    data = {std: [] for std in positions.values()}
+    for fields in csv.reader(lines):
+        for position, std in positions.items():
+            value = fields[position] if position < len(fields) else ""
+            data[std].append(None if value in null_values else value)
+    return pd.DataFrame(data, dtype=object)
+
+
+def _arrow_chunks(source, column_map, chunksize, names=None):
+    # Named up front: pyarrow would take a line of spaces for the header,
+    # and the names of ragged rows' fields are needed
+    skip_rows = 0
+    if names is None:
+        names, skip_rows = skip_header(source)
+        source.seek(0)
+    positions = {names.index(raw): std for raw, std in column_map.items()}
+    ragged = deque()
+
+    def skip_ragged(row):
+        # Called from the parser threads
+        ragged.append(row.text)
+        return "skip"
+
+    read_options = pa_csv.ReadOptions(
+        use_threads=True,
+        block_size=max(chunksize * ARROW_BYTES_PER_ROW, 1 << 20),
+        column_names=names,
+        skip_rows=skip_rows,
+    )
+    parse_options = pa_csv.ParseOptions(invalid_row_handler=skip_ragged)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=list(column_map),
+        column_types={raw: pa.string() for raw in column_map},
+        strings_can_be_null=True,
+    )
+    null_values = set(convert_options.null_values)
+    # Explicit mode: uploaded temporary files report "w+b"
+    reader = pa_csv.open_csv(
+        pa.PythonFile(source, mode="r"),
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options,
+    )
+    for batch in reader:
+        data = {}
+        for raw, std in column_map.items():
+            column = batch.column(batch.schema.get_field_index(raw))
+            if std in METRICS:
+                data[std] = _arrow_float(column)
+            else:
+                data[std] = column.to_pandas()
+        yield pd.DataFrame(data)
+        if ragged:
+            lines = [ragged.popleft() for _ in range(len(ragged))]
+            yield _ragged_frame(lines, positions, null_values)
+    if ragged:
+        yield _ragged_frame(list(ragged), positions, null_values)
+
+
+def read_chunks(source, column_map, chunksize=DEFAULT_CHUNK_SIZE, parser="c", names=None):
+    """
+    Yield cleaned chunks of the columns in ``column_map`` from ``source``.
+
+    ``names`` gives the header of a headerless source (a byte range of a
+    file, see ``analyzer.parallel``).
+    """
+    backend = _arrow_chunks if resolve_parser(parser) == "pyarrow" else _c_chunks
+    chunks = backend(source, column_map, chunksize, names)
+    try:
+        for chunk in chunks:
+            yield clean_chunk(chunk)
+    except DecompressionError as exc:
+        raise IngestError(str(exc))
+    except PARSE_ERRORS as exc:
+        raise IngestError(f"Could not parse CSV: {exc}")
+    finally:
+        chunks.close()
+
+
+def iter_chunks(fileobj, chunksize=DEFAULT_CHUNK_SIZE, parser="c", alias_index=ALIAS_INDEX):
+    """Yield cleaned chunks of a CSV upload, resolving the columns once."""
+    column_map = resolve_columns(read_header(fileobj), alias_index)
+    yield from read_chunks(fileobj, column_map, chunksize, parser)
+
+
+def ingest_csv(fileobj, chunksize=DEFAULT_CHUNK_SIZE, progress=None, dataset=None,
+               max_size=None, parser="c", alias_index=ALIAS_INDEX):
+    """
+    Stream a CSV upload into a ``PartialAggregate``.
+
+    Each chunk is reduced to per-type partials and merged into the running
+    aggregate, so only one row per type is kept between chunks.
+    ``progress(rows, bytes_read)`` is called after every chunk, and the
+    cleaned rows are appended to ``dataset`` (a ``storage.DatasetWriter``).
+
+    gzip/bz2/zstd compressed uploads are decompressed on the fly; their
+    decompressed size is limited to ``max_size`` bytes and ``bytes_read``
+    counts compressed bytes. ``parser`` selects the backend, see
+    ``resolve_parser``; ``alias_index`` comes from ``build_alias_index``.
+    """
+    raw = fileobj
+    try:
+        fileobj = decompressed(raw, max_size)
+    except DecompressionError as exc:
+        raise IngestError(str(exc))
+
+    # Reject a file with the wrong columns before parsing or storing anything
+    column_map = resolve_columns(read_header(fileobj), alias_index)
+
+    part = dataset.open_part() if dataset is not None else None
+    aggregate = PartialAggregate()
+    rows = 0
+    for chunk in read_chunks(fileobj, column_map, chunksize, parser):
+        aggregate = aggregate.merge(PartialAggregate.from_frame(chunk))
+        if part is not None:
+            part.append(chunk)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows, raw.tell())
+
+    if part is not None:
+        dataset.add_part(part.close())
+
+    return aggregate
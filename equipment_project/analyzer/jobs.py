@@ -0,0 +1,119 @@
+"""
+Background ingestion of stored uploads.
+
+Jobs live in the ``IngestJob`` table, which doubles as the queue: a job is
+claimed by atomically flipping it from ``queued`` to ``running``, so the
+in-process worker pool and the ``process_ingest_jobs`` management command
+can drain the same queue without an external broker. Running jobs touch
+``updated_at`` as they progress; one that has not moved for
+``INGEST_JOB_TIMEOUT`` seconds was lost with its worker and is queued again.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .ingest import IngestError
+from .models import IngestJob
+from .services import process_upload
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.INGEST_WORKERS,
+                thread_name_prefix="ingest",
+            )
+        return _executor
+
+
+def enqueue(job):
+    """Hand a saved job to the worker pool once its row is committed."""
+    transaction.on_commit(lambda: get_executor().submit(run_job, job.pk))
+
+
+def claim(job_id):
+    return IngestJob.objects.filter(pk=job_id, status=IngestJob.QUEUED).update(
+        status=IngestJob.RUNNING
+    ) == 1
+
+
+def run_job(job_id):
+    """Process one queued job. Returns False if another worker claimed it."""
+    close_old_connections()
+    try:
+        if not claim(job_id):
+            return False
+
+        job = IngestJob.objects.select_related("user").get(pk=job_id)
+        size = job.file.size or 1
+
+        def progress(rows, bytes_read):
+            IngestJob.objects.filter(pk=job_id).update(
+                rows_processed=rows,
+                progress=min(bytes_read / size, 0.99),
+                updated_at=timezone.now(),
+            )
+
+        try:
+            with job.file.open("rb") as fileobj:
+                upload, _ = process_upload(
+                    job.user, job.file_name, fileobj, progress=progress,
+                    content_hash=job.content_hash,
+                )
+        except IngestError as exc:
+            _finish(job, IngestJob.FAILED, error=str(exc))
+        except Exception:
+            logger.exception("Ingest job %s failed", job_id)
+            _finish(job, IngestJob.FAILED, error="Internal error while processing the file")
+        else:
+            _finish(job, IngestJob.DONE, upload=upload)
+        return True
+    finally:
+        close_old_connections()
+
+
+def _finish(job, status, upload=None, error=""):
+    job.status = status
+    job.error = error
+    job.upload = upload
+    if upload is not None:
+        job.progress = 1
+        job.rows_processed = upload.total_records
+    job.save(update_fields=["status", "error", "upload", "progress", "rows_processed", "updated_at"])
+    # The stored CSV is only needed until it has been processed
+    job.file.delete(save=False)
+
+
+def requeue_stale():
+    """Queue running jobs again that saw no progress for INGEST_JOB_TIMEOUT seconds."""
+    cutoff = timezone.now() - timedelta(seconds=settings.INGEST_JOB_TIMEOUT)
+    stale = IngestJob.objects.filter(status=IngestJob.RUNNING, updated_at__lt=cutoff)
+    count = stale.update(
+        status=IngestJob.QUEUED, progress=0, rows_processed=0, updated_at=timezone.now()
+    )
+    if count:
+        logger.warning("Requeued %s stale ingest job(s)", count)
+    return count
+
+
+def run_pending():
+    """Process every queued (or stale) job in the calling thread. Returns the count."""
+    requeue_stale()
+    processed = 0
+    queued = IngestJob.objects.filter(status=IngestJob.QUEUED).order_by("created_at")
+    for job_id in list(queued.values_list("pk", flat=True)):
+        if run_job(job_id):
+            processed += 1
+    return processed
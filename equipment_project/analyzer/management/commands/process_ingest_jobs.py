@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analyzer.jobs import run_pending
+from analyzer.resumable import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Process queued background CSV ingestion jobs and purge finished upload sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true",
+            help="Keep polling the queue instead of exiting once it is empty.",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=2.0,
+            help="Seconds between polls when --loop is given.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = run_pending()
+            purge_expired()
+            if processed:
+                self.stdout.write(f"Processed {processed} job(s)")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
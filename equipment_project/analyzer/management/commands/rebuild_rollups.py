@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from analyzer.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-type rollups from the aggregates stored on uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild the rollups of this username.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user named '{options['user']}'")
+        rebuild_rollups(user)
+        self.stdout.write("Rollups rebuilt")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0003_upload_per_type_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='aggregate',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0005_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='dataset',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
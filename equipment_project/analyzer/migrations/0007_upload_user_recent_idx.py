@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0006_upload_dataset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='upload',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='upload_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0007_upload_user_recent_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TypeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('type', models.CharField(max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('flowrate_sum', models.FloatField(default=0)),
+                ('flowrate_m2', models.FloatField(default=0)),
+                ('flowrate_min', models.FloatField(null=True)),
+                ('flowrate_max', models.FloatField(null=True)),
+                ('pressure_sum', models.FloatField(default=0)),
+                ('pressure_m2', models.FloatField(default=0)),
+                ('pressure_min', models.FloatField(null=True)),
+                ('pressure_max', models.FloatField(null=True)),
+                ('temperature_sum', models.FloatField(default=0)),
+                ('temperature_m2', models.FloatField(default=0)),
+                ('temperature_min', models.FloatField(null=True)),
+                ('temperature_max', models.FloatField(null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'type'), name='rollup_user_day_type_uniq')],
+            },
+        ),
+    ]
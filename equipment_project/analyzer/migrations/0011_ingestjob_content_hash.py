@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyzer', '0010_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
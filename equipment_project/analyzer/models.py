@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -15,6 +17,126 @@ class Upload(models.Model):
     avg_temperature = models.FloatField(default=0)
     type_distribution = models.JSONField(default=dict)
     per_type_stats = models.JSONField(default=dict)
+
+    # Mergeable per-type partials (see analyzer.aggregates.PartialAggregate)
+    aggregate = models.JSONField(default=dict)
+
+    # Cleaned rows in columnar form, relative to MEDIA_ROOT (see analyzer.storage)
+    dataset = models.CharField(max_length=255, blank=True)
+
+    # BLAKE2b digest of the uploaded bytes, used to skip re-parsing repeats
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Upload history is always listed per user, newest first
+            models.Index(fields=["user", "-uploaded_at", "-id"], name="upload_user_recent_idx"),
+        ]
    
     def __str__(self):
         return self.file_name
+
+
+class IngestJob(models.Model):
+    """A stored upload waiting for (or going through) background ingestion."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    file = models.FileField(upload_to="jobs/")
+    file_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    progress = models.FloatField(default=0)
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    upload = models.ForeignKey(Upload, null=True, blank=True, on_delete=models.SET_NULL)
+    # BLAKE2b digest of the file when it was computed while receiving it
+    content_hash = models.CharField(max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+
+class TypeRollup(models.Model):
+    """
+    Per user, day and equipment type partial aggregates across uploads.
+
+    Rows hold the same count/sum/M2/min/max partials as
+    ``analyzer.aggregates.PartialAggregate`` and are merged into as uploads
+    are created, so trends over many uploads never touch their JSON stats.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    type = models.CharField(max_length=255)
+    count = models.BigIntegerField(default=0)
+
+    flowrate_sum = models.FloatField(default=0)
+    flowrate_m2 = models.FloatField(default=0)
+    flowrate_min = models.FloatField(null=True)
+    flowrate_max = models.FloatField(null=True)
+
+    pressure_sum = models.FloatField(default=0)
+    pressure_m2 = models.FloatField(default=0)
+    pressure_min = models.FloatField(null=True)
+    pressure_max = models.FloatField(null=True)
+
+    temperature_sum = models.FloatField(default=0)
+    temperature_m2 = models.FloatField(default=0)
+    temperature_min = models.FloatField(null=True)
+    temperature_max = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day", "type"], name="rollup_user_day_type_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.day} {self.type}"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress (see ``analyzer.resumable``): the file
+    arrives as numbered chunks and becomes an ``IngestJob`` once finalized.
+    """
+
+    OPEN = "open"
+    FINALIZED = "finalized"
+    STATUS_CHOICES = [
+        (OPEN, "Open"),
+        (FINALIZED, "Finalized"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=OPEN, db_index=True)
+    job = models.ForeignKey(IngestJob, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total_chunks(self):
+        return -(-self.size // self.chunk_size)
+
+    def chunk_length(self, index):
+        """Expected byte length of chunk ``index`` (only the last one is short)."""
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination over ``(uploaded_at, id)``, newest first.
+
+The cursor encodes the sort key of the last row on a page, so fetching the
+next page is an index range scan on ``(user, -uploaded_at, -id)`` no matter
+how deep into the history the client is.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(upload):
+    raw = f"{upload.uploaded_at.isoformat()}|{upload.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, pk = raw.rsplit("|", 1)
+        uploaded_at = parse_datetime(timestamp)
+        pk = int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+    if uploaded_at is None:
+        raise InvalidCursor("Invalid cursor")
+    return uploaded_at, pk
+
+
+def page_size(value):
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'limit' must be an integer")
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def paginate(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Return ``(rows, next_cursor)`` for one page of ``queryset``."""
+    queryset = queryset.order_by("-uploaded_at", "-id")
+    if cursor:
+        uploaded_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk)
+        )
+
+    rows = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,269 @@
+"""
+Parallel ingestion of CSV files stored on disk.
+
+The body of the file is split into byte ranges aligned to line starts and
+each range is parsed and aggregated in a worker process. The per-range
+partial aggregates are merged at the end, so throughput scales with the
+number of cores.
+
+Ranges are aligned on raw newlines. Workers count the quote characters of
+their range, so a boundary that falls inside a quoted field (one with a
+line break) shows up as an odd number of quotes before it; the file is
+then parsed again by the streaming path in ``analyzer.ingest``, as it is
+when a range fails to parse. Compressed files always take that path.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from .aggregates import PartialAggregate
+from .ingest import (
+    ALIAS_INDEX, DEFAULT_CHUNK_SIZE, IngestError, ingest_csv, read_chunks, read_header,
+    resolve_columns, skip_header,
+)
+from .storage import DatasetWriter, PartWriter
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+class WorkerCrashed(Exception):
+    """A pool worker died (e.g. killed for memory). The message is user facing."""
+
+
+def get_pool(workers, name="ingest"):
+    """
+    A long-lived process pool per ``name``; spawned so workers never
+    inherit threads.
+    """
+    with _pool_lock:
+        pool, pool_workers = _pools.get(name, (None, None))
+        if pool is None or pool_workers != workers:
+            if pool is not None:
+                pool.shutdown(wait=False)
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pools[name] = (pool, workers)
+        return pool
+
+
+def discard_pool(pool, name="ingest"):
+    """Forget a broken pool so the next ``get_pool`` starts a new one."""
+    with _pool_lock:
+        if _pools.get(name, (None, None))[0] is pool:
+            del _pools[name]
+    pool.shutdown(wait=False)
+
+
+@contextmanager
+def pool_guard(pool, name):
+    """
+    Turn a ``BrokenProcessPool`` from ``pool`` into ``WorkerCrashed``,
+    discarding the pool so the next request gets a working one.
+    """
+    try:
+        yield
+    except BrokenProcessPool:
+        discard_pool(pool, name)
+        raise WorkerCrashed("A worker process stopped unexpectedly, please try again")
+
+
+class _RangeReader:
+    """File-like view over ``[start, end)`` of a binary file that counts its quotes."""
+
+    def __init__(self, fileobj, start, end):
+        self.fileobj = fileobj
+        self.start = start
+        self.end = end
+        self.quotes = 0
+        self.counted = start  # quotes are counted up to here
+        self.closed = False
+        fileobj.seek(start)
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return False
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.fileobj.tell() - self.start
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # Positions are relative to the range, as for a file holding only it
+        base = {os.SEEK_SET: self.start, os.SEEK_CUR: self.fileobj.tell(), os.SEEK_END: self.end}
+        position = min(max(base[whence] + offset, self.start), self.end)
+        return self.fileobj.seek(position) - self.start
+
+    def close(self):
+        # The underlying file belongs to the caller
+        self.closed = True
+
+    def read(self, size=-1):
+        position = self.fileobj.tell()
+        remaining = self.end - position
+        if remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self.fileobj.read(size)
+        # Bytes read again after a seek back were counted already
+        if position + len(data) > self.counted:
+            self.quotes += data.count(b'"', max(self.counted - position, 0))
+            self.counted = position + len(data)
+        return data
+
+    def __iter__(self):
+        return iter(lambda: self.read(1 << 16), b"")
+
+
+def split_ranges(path, parts):
+    """Split the body of a CSV file into at most ``parts`` line-aligned ranges."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        skip_header(f)
+        body_start = f.tell()
+        step = max((size - body_start) // max(parts, 1), 1)
+
+        bounds = [body_start]
+        for i in range(1, parts):
+            target = body_start + i * step
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()  # move to the start of the next line
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(size)
+
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def aggregate_range(path, start, end, names, column_map,
+                    chunksize=DEFAULT_CHUNK_SIZE, part_path=None, parser="c"):
+    """
+    Worker entry point: parse one byte range and aggregate it.
+
+    When ``part_path`` is given the cleaned rows are also written there as
+    one dataset part, whose metadata is returned alongside the aggregate.
+    """
+    part = PartWriter(part_path) if part_path is not None else None
+    aggregate = PartialAggregate()
+    rows = 0
+    with open(path, "rb") as f:
+        source = _RangeReader(f, start, end)
+        for chunk in read_chunks(source, column_map, chunksize, parser, names=names):
+            aggregate = aggregate.merge(PartialAggregate.from_frame(chunk))
+            if part is not None:
+                part.append(chunk)
+            rows += len(chunk)
+        quotes = source.quotes
+    part_meta = part.close() if part is not None else None
+    return aggregate, rows, end - start, part_meta, quotes
+
+
+def ingest_file(path, chunksize=DEFAULT_CHUNK_SIZE, dataset_path=None, max_size=None,
+                parser="c", alias_index=ALIAS_INDEX):
+    """
+    Worker entry point: aggregate a whole CSV file (used for bulk uploads,
+    where the parallelism is across files rather than within one).
+    """
+    writer = DatasetWriter(dataset_path) if dataset_path is not None else None
+    try:
+        with open(path, "rb") as f:
+            aggregate = ingest_csv(
+                f, chunksize=chunksize, dataset=writer, max_size=max_size,
+                parser=parser, alias_index=alias_index,
+            )
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    return aggregate
+
+
+def ingest_parallel(path, workers, chunksize=DEFAULT_CHUNK_SIZE,
+                    progress=None, dataset=None, parser="c", alias_index=ALIAS_INDEX):
+    """
+    Aggregate a stored CSV file across ``workers`` processes.
+
+    Returns the same ``PartialAggregate`` as ``ingest.ingest_csv`` would;
+    with a ``storage.DatasetWriter`` every range becomes one dataset part.
+    Files the ranges cannot split correctly are parsed by ``ingest_csv``.
+    """
+    with open(path, "rb") as f:
+        names = read_header(f)
+    column_map = resolve_columns(names, alias_index)
+
+    ranges = split_ranges(path, workers)
+    if not ranges:
+        return PartialAggregate()
+
+    pool = get_pool(workers)
+    results = {}
+    rows = bytes_read = 0
+    futures = {}
+    fallback = False
+    try:
+        with pool_guard(pool, "ingest"):
+            for i, (start, end) in enumerate(ranges):
+                futures[pool.submit(
+                    aggregate_range, path, start, end, names, column_map, chunksize,
+                    dataset.part_path(i) if dataset is not None else None, parser,
+                )] = i
+            for future in as_completed(futures):
+                partial, n, length, part_meta, quotes = future.result()
+                results[futures[future]] = (partial, part_meta, quotes)
+                rows += n
+                bytes_read += length
+                if progress is not None:
+                    progress(rows, bytes_read)
+    except WorkerCrashed as exc:
+        raise IngestError(str(exc))
+    except IngestError:
+        # Possibly a range that starts inside a quoted field
+        fallback = True
+    finally:
+        for future in futures:
+            future.cancel()
+
+    # A range boundary is inside a quoted field when the quotes before it are odd
+    quotes = 0
+    for i in range(len(ranges) - 1):
+        if fallback:
+            break
+        quotes += results[i][2]
+        fallback = quotes % 2 == 1
+
+    if fallback:
+        # No worker may still be writing into the dataset
+        wait(futures)
+        return _ingest_streaming(path, chunksize, progress, dataset, parser, alias_index)
+
+    if dataset is not None:
+        for i in range(len(ranges)):
+            dataset.add_part(results[i][1])
+    return PartialAggregate.merge_all(partial for partial, _, _ in results.values())
+
+
+def _ingest_streaming(path, chunksize, progress, dataset, parser, alias_index):
+    if dataset is not None:
+        dataset.reset()
+    with open(path, "rb") as f:
+        return ingest_csv(
+            f, chunksize=chunksize, progress=progress, dataset=dataset,
+            parser=parser, alias_index=alias_index,
+        )
@@ -0,0 +1,147 @@
+"""
+Headless chart rendering with matplotlib (Agg / SVG backends).
+
+Charts are drawn from the series of ``analyzer.charts`` in a process pool
+and cached on disk, keyed by upload, chart kind, size, ``top`` and format:
+
+    MEDIA_ROOT/charts/<upload id>/<kind>-<width>x<height>-top<N>-v<version>.<format>
+
+Uploads never change, so a cached image stays valid until the upload is
+deleted (which removes its directory) or ``RENDER_VERSION`` is bumped.
+"""
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+
+from .charts import DEFAULT_TOP, chart_series
+from .parallel import get_pool, pool_guard
+
+CHART_KINDS = ("pie", "bar")
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+DEFAULT_SIZE = (800, 600)
+MIN_SIZE, MAX_SIZE = 100, 4000
+DPI = 100
+RENDER_VERSION = 1
+
+COLORS = ["#FF6B9D", "#4ECDC4", "#FFE66D", "#95E1D3", "#A8E6CF", "#FF8B94", "#C7CEEA", "#FFDAB9"]
+METRIC_COLORS = {"flowrate": "#3B82F6", "pressure": "#10B981", "temperature": "#F59E0B"}
+
+
+def size_param(value, default):
+    if value in (None, ""):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("'width' and 'height' must be integers")
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise ValueError(f"'width' and 'height' must be between {MIN_SIZE} and {MAX_SIZE}")
+    return size
+
+
+# -----------------------------
+# DRAWING
+# -----------------------------
+def _draw_pie(fig, series):
+    ax = fig.add_subplot(111)
+    if series["counts"]:
+        ax.pie(
+            series["counts"],
+            labels=series["labels"],
+            autopct="%1.1f%%",
+            colors=[COLORS[i % len(COLORS)] for i in range(len(series["labels"]))],
+            startangle=90,
+            textprops={"fontsize": 9},
+        )
+    ax.set_title("Type Distribution", fontsize=14, weight="bold")
+    ax.axis("equal")
+
+
+def _draw_bar(fig, series):
+    ax = fig.add_subplot(111)
+    labels = series["labels"]
+    metrics = [key[len("avg_"):] for key in series["series"]]
+    width = 0.8 / max(len(metrics), 1)
+    for i, metric in enumerate(metrics):
+        offset = (i - (len(metrics) - 1) / 2) * width
+        ax.bar(
+            [x + offset for x in range(len(labels))],
+            series["series"][f"avg_{metric}"],
+            width,
+            label=f"Avg {metric.capitalize()}",
+            color=METRIC_COLORS.get(metric, COLORS[i % len(COLORS)]),
+        )
+    ax.set_xticks(range(len(labels)))
+    rotate = len(labels) > 6
+    ax.set_xticklabels(labels, rotation=45 if rotate else 0, ha="right" if rotate else "center")
+    ax.set_title("Per Type Averages", fontsize=14, weight="bold")
+    ax.legend()
+    ax.grid(axis="y", alpha=0.3)
+
+
+DRAW = {"pie": _draw_pie, "bar": _draw_bar}
+
+
+def render_chart(series, kind, fmt="png", width=DEFAULT_SIZE[0], height=DEFAULT_SIZE[1]):
+    """Render a chart to PNG or SVG bytes. Safe to run in a worker process."""
+    # The Figure API (no pyplot) keeps no global state and needs no display
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(width / DPI, height / DPI), dpi=DPI, facecolor="white")
+    DRAW[kind](fig, series)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+# -----------------------------
+# DISK CACHE
+# -----------------------------
+def chart_dir(upload_id):
+    return os.path.join(settings.MEDIA_ROOT, "charts", str(upload_id))
+
+
+def chart_path(upload_id, kind, fmt, width, height, top):
+    name = f"{kind}-{width}x{height}-top{top}-v{RENDER_VERSION}.{fmt}"
+    return os.path.join(chart_dir(upload_id), name)
+
+
+def delete_charts(upload_id):
+    shutil.rmtree(chart_dir(upload_id), ignore_errors=True)
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def chart_image(upload, kind, fmt="png", width=DEFAULT_SIZE[0], height=DEFAULT_SIZE[1],
+                top=DEFAULT_TOP, pool=True):
+    """
+    Path of the rendered chart, rendering it (in the pool unless
+    ``pool=False``) when it is not cached yet.
+    """
+    path = chart_path(upload.pk, kind, fmt, width, height, top)
+    if os.path.exists(path):
+        return path
+
+    series = chart_series(upload, top=top)
+    if pool:
+        executor = get_pool(settings.CHART_RENDER_WORKERS, name="render")
+        with pool_guard(executor, "render"):
+            data = executor.submit(render_chart, series, kind, fmt, width, height).result()
+    else:
+        data = render_chart(series, kind, fmt, width, height)
+    write_atomic(path, data)
+    return path
@@ -0,0 +1,198 @@
+"""
+PDF reports of uploads with reportlab.
+
+Each report holds the overall statistics, the per-type table (top types
+plus "Other", as in ``analyzer.charts``) and the pie and bar charts. The
+Django side only collects plain data; ``render_report`` runs in a worker
+process, renders any chart image missing from the disk cache of
+``analyzer.rendering`` and lays out the PDF.
+
+Batches render in the process pool and are streamed as a ZIP archive with
+one PDF per upload, in the order requested.
+"""
+import io
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+from .charts import chart_series
+from .parallel import get_pool, pool_guard
+from .rendering import chart_path, render_chart, write_atomic
+from .stats import METRICS
+
+REPORT_TOP = 20
+REPORT_CHART_SIZE = (800, 600)
+MAX_BATCH_SIZE = 500
+
+REPORT_FIELDS = [
+    "id", "file_name", "uploaded_at", "total_records",
+    *[f"avg_{m}" for m in METRICS], "aggregate", "per_type_stats",
+]
+
+
+def report_filename(upload):
+    stem = os.path.splitext(os.path.basename(upload.file_name))[0]
+    stem = re.sub(r"[^\w.-]+", "_", stem).strip("_") or "upload"
+    return f"report-{upload.pk}-{stem}.pdf"
+
+
+def report_data(upload):
+    """Everything a worker needs to render the report of ``upload``."""
+    series = chart_series(upload, top=REPORT_TOP)
+    width, height = REPORT_CHART_SIZE
+    return {
+        "id": upload.pk,
+        "file_name": upload.file_name,
+        "uploaded_at": upload.uploaded_at.strftime("%Y-%m-%d %H:%M"),
+        "total_records": upload.total_records,
+        "averages": {m: getattr(upload, f"avg_{m}") for m in METRICS},
+        "series": series,
+        "charts": {
+            kind: chart_path(upload.pk, kind, "png", width, height, REPORT_TOP)
+            for kind in ("pie", "bar")
+        },
+    }
+
+
+# -----------------------------
+# RENDERING (worker side)
+# -----------------------------
+def _number(value):
+    return "-" if value is None else f"{value:,.2f}"
+
+
+def _table(rows):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    table = Table(rows, repeatRows=1, hAlign="LEFT")
+    table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E5E7EB")),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#9CA3AF")),
+        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ]))
+    return table
+
+
+def render_report(data):
+    """Render one report to PDF bytes. Runs in a worker process."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+    # Chart images are shared with the image endpoint and across reports
+    for kind, path in data["charts"].items():
+        if not os.path.exists(path):
+            write_atomic(path, render_chart(data["series"], kind, "png", *REPORT_CHART_SIZE))
+
+    styles = getSampleStyleSheet()
+    # Paragraphs take markup, so user supplied text must be escaped
+    story = [
+        Paragraph(f"Equipment Report: {escape(data['file_name'])}", styles["Title"]),
+        Paragraph(f"Upload #{data['id']}, uploaded {data['uploaded_at']}", styles["Normal"]),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Overall Statistics", styles["Heading2"]),
+        _table(
+            [["Total Records"] + [f"Avg {m.capitalize()}" for m in data["averages"]],
+             [f"{data['total_records']:,}"] + [_number(v) for v in data["averages"].values()]]
+        ),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Per Type Statistics", styles["Heading2"]),
+    ]
+
+    series = data["series"]
+    header = ["Type", "Count"] + [f"Avg {key[4:].capitalize()}" for key in series["series"]]
+    rows = [header]
+    for i, label in enumerate(series["labels"]):
+        rows.append(
+            [label, f"{series['counts'][i]:,}"]
+            + [_number(values[i]) for values in series["series"].values()]
+        )
+    story.append(_table(rows))
+    if series["other"]:
+        story.append(Paragraph(
+            f"Other: {series['other']['types']:,} smaller types, "
+            f"{series['other']['count']:,} records", styles["Italic"],
+        ))
+
+    width = A4[0] - 4 * cm
+    height = width * REPORT_CHART_SIZE[1] / REPORT_CHART_SIZE[0]
+    story.append(PageBreak())
+    for kind in ("pie", "bar"):
+        story.append(Image(data["charts"][kind], width=width, height=height))
+        story.append(Spacer(1, 0.5 * cm))
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=f"Report {data['file_name']}",
+        leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm,
+    )
+    doc.build(story)
+    return buffer.getvalue()
+
+
+# -----------------------------
+# BATCHES
+# -----------------------------
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that hands out what was written."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def render_one(upload):
+    pool = get_pool(settings.REPORT_WORKERS, name="reports")
+    with pool_guard(pool, "reports"):
+        return pool.submit(render_report, report_data(upload)).result()
+
+
+def iter_reports(uploads):
+    """
+    Yield ``(upload, pdf_bytes)`` in order while the pool renders ahead,
+    keeping at most two reports per worker in flight.
+    """
+    workers = settings.REPORT_WORKERS
+    pool = get_pool(workers, name="reports")
+    pending = []
+    uploads = iter(uploads)
+    try:
+        with pool_guard(pool, "reports"):
+            for upload in uploads:
+                pending.append((upload, pool.submit(render_report, report_data(upload))))
+                if len(pending) >= 2 * workers:
+                    upload, future = pending.pop(0)
+                    yield upload, future.result()
+            for upload, future in pending:
+                yield upload, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def stream_zip(uploads):
+    """Stream a ZIP archive with one PDF report per upload."""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for upload, pdf in iter_reports(uploads):
+            archive.writestr(report_filename(upload), pdf)
+            yield buffer.pop()
+    yield buffer.pop()
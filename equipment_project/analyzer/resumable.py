@@ -0,0 +1,223 @@
+"""
+Resumable uploads of large files, sent as numbered chunks.
+
+    POST   /api/upload_csv/sessions/                   {file_name, size[, chunk_size]}
+    GET    /api/upload_csv/sessions/<id>/              chunks received so far
+    PUT    /api/upload_csv/sessions/<id>/chunks/<n>/   raw bytes + X-Chunk-SHA256 header
+    POST   /api/upload_csv/sessions/<id>/finalize/     queue the file for processing
+    DELETE /api/upload_csv/sessions/<id>/              abort
+
+Every chunk is written straight to its offset in one staging file under
+``MEDIA_ROOT/sessions/<id>/`` and recorded by a marker file once its
+checksum matched, so chunks may arrive in any order, in parallel and more
+than once. Finalizing moves the staging file into ``MEDIA_ROOT/jobs/`` (a
+rename, no copy) and queues an ``IngestJob``, exactly like an ``?async=1``
+upload.
+"""
+import hashlib
+import os
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ingest import IngestError
+from .jobs import enqueue
+from .models import IngestJob, UploadSession
+from .services import check_header
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+CHECKSUM_HEADER = "HTTP_X_CHUNK_SHA256"
+
+
+class ChunkError(Exception):
+    """Raised for a chunk that cannot be accepted. The message is user facing."""
+
+
+def session_dir(session):
+    return os.path.join(settings.MEDIA_ROOT, "sessions", session.pk.hex)
+
+
+def _data_path(session):
+    return os.path.join(session_dir(session), "data")
+
+
+def _marker_dir(session):
+    return os.path.join(session_dir(session), "chunks")
+
+
+def create_session(user, file_name, size, chunk_size=None):
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ChunkError(
+            f"'chunk_size' must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes"
+        )
+    if size <= 0:
+        raise ChunkError("The file is empty")
+
+    session = UploadSession.objects.create(
+        user=user, file_name=file_name[-255:], size=size, chunk_size=chunk_size
+    )
+    os.makedirs(_marker_dir(session))
+    # Sparse until the chunks arrive
+    with open(_data_path(session), "wb") as f:
+        f.truncate(size)
+    return session
+
+
+def received_chunks(session):
+    try:
+        names = os.listdir(_marker_dir(session))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name) for name in names if name.isdigit())
+
+
+def write_chunk(session, index, stream, checksum):
+    """
+    Write chunk ``index`` from the request ``stream`` at its offset. It is
+    only recorded as received when its length and SHA-256 (hex) match.
+    """
+    if not 0 <= index < session.total_chunks:
+        raise ChunkError(f"Chunk index must be between 0 and {session.total_chunks - 1}")
+    if not checksum:
+        raise ChunkError("Missing X-Chunk-SHA256 header")
+
+    checksum = checksum.strip().lower()
+    marker = os.path.join(_marker_dir(session), str(index))
+    try:
+        with open(marker) as f:
+            stored = f.read()
+    except FileNotFoundError:
+        stored = None
+    if stored is not None and stored != checksum:
+        # A different body replaces the chunk; it is missing until verified
+        os.remove(marker)
+
+    expected = session.chunk_length(index)
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(_data_path(session), "r+b") as f:
+            f.seek(index * session.chunk_size)
+            while stream is not None and written <= expected:
+                block = stream.read(min(BLOCK_SIZE, expected + 1 - written))
+                if not block:
+                    break
+                # A retry of a received chunk is verified but not rewritten
+                if stored != checksum and written + len(block) <= expected:
+                    f.write(block)
+                digest.update(block)
+                written += len(block)
+    except FileNotFoundError:
+        raise ChunkError("The upload session is no longer accepting chunks")
+
+    if written != expected:
+        raise ChunkError(f"Chunk {index} must be {expected} bytes, got {written}")
+    if digest.hexdigest() != checksum:
+        raise ChunkError(f"Checksum mismatch for chunk {index}")
+
+    # The marker holds the checksum, so identical retries are recognised
+    with open(marker, "w") as f:
+        f.write(checksum)
+    # Keeps an active session from expiring
+    UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now())
+
+
+def missing_chunks(session):
+    received = set(received_chunks(session))
+    return [i for i in range(session.total_chunks) if i not in received]
+
+
+def finalize_session(session):
+    """
+    Queue the assembled file as an ``IngestJob`` and return it. Finalizing
+    twice returns the same job. Raises ``ChunkError`` while chunks are
+    missing and ``IngestError`` (after discarding the session) when the
+    file is not a usable CSV. On any other failure the session is open
+    again, so finalizing can be retried.
+    """
+    if session.status == UploadSession.FINALIZED:
+        if session.job is None:
+            raise ChunkError("The upload is already being finalized")
+        return session.job
+
+    missing = missing_chunks(session)
+    if missing:
+        raise ChunkError(f"{len(missing)} chunk(s) missing, first is {missing[0]}")
+
+    # Only one request gets to move the file
+    claimed = UploadSession.objects.filter(pk=session.pk, status=UploadSession.OPEN).update(
+        status=UploadSession.FINALIZED
+    )
+    if not claimed:
+        session.refresh_from_db()
+        if session.job is None:
+            raise ChunkError("The upload is already being finalized")
+        return session.job
+
+    try:
+        return _queue_job(session)
+    except IngestError:
+        abort_session(session)
+        raise
+    except BaseException:
+        UploadSession.objects.filter(pk=session.pk).update(
+            status=UploadSession.OPEN, updated_at=timezone.now()
+        )
+        session.status = UploadSession.OPEN
+        raise
+
+
+def _queue_job(session):
+    with open(_data_path(session), "rb") as f:
+        check_header(f)
+
+    name = default_storage.get_available_name(
+        IngestJob._meta.get_field("file").generate_filename(None, session.file_name)
+    )
+    target = default_storage.path(name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(_data_path(session), target)
+    try:
+        with transaction.atomic():
+            job = IngestJob.objects.create(
+                user=session.user, file=name, file_name=session.file_name
+            )
+            session.job = job
+            session.status = UploadSession.FINALIZED
+            session.save(update_fields=["job", "status", "updated_at"])
+            enqueue(job)
+    except BaseException:
+        session.job = None
+        # Back where a retry expects it
+        os.replace(target, _data_path(session))
+        raise
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+    return job
+
+
+def abort_session(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+    session.delete()
+
+
+def purge_expired():
+    """
+    Discard open sessions that saw no chunk for UPLOAD_SESSION_TTL seconds,
+    and finalized ones once their job has finished (or is gone).
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    stale = UploadSession.objects.filter(
+        Q(status=UploadSession.OPEN, updated_at__lt=cutoff)
+        | Q(status=UploadSession.FINALIZED, job__status__in=[IngestJob.DONE, IngestJob.FAILED])
+        | Q(status=UploadSession.FINALIZED, job__isnull=True, updated_at__lt=cutoff)
+    )
+    for session in stale:
+        abort_session(session)
@@ -0,0 +1,157 @@
+"""
+Cross-upload rollups per user, day and equipment type.
+
+Every new upload merges its ``PartialAggregate`` into the ``TypeRollup``
+rows of its day; deleting an upload recomputes that day. Week and month buckets are computed in SQL from the daily
+rows: counts, sums, minima and maxima simply add up, and the pooled M2 is
+recovered from ``sum(M2_i + S_i^2 / n_i) - S^2 / n``.
+"""
+import pandas as pd
+from django.db import transaction
+from django.db.models import F, FloatField, Max, Min, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .aggregates import PARTS, PartialAggregate
+from .models import TypeRollup, Upload
+from .stats import METRICS
+
+BUCKETS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+ROLLUP_FIELDS = ["count"] + [f"{m}_{p}" for m in METRICS for p in PARTS]
+
+
+def _rows_to_aggregate(rows):
+    frame = pd.DataFrame(
+        [[getattr(r, f) for f in ROLLUP_FIELDS] for r in rows],
+        columns=ROLLUP_FIELDS,
+        index=pd.Index([r.type for r in rows], name="type"),
+        dtype="float64",
+    )
+    return PartialAggregate(frame)
+
+
+def record_upload(upload, aggregate):
+    """Merge an upload's aggregate into the rollup rows of its day."""
+    _merge_into_day(upload.user_id, timezone.localdate(upload.uploaded_at), aggregate)
+
+
+def _merge_into_day(user_id, day, aggregate):
+    if aggregate.frame.empty:
+        return
+
+    types = [str(t) for t in aggregate.frame.index]
+
+    with transaction.atomic():
+        existing = {
+            row.type: row
+            for row in TypeRollup.objects.select_for_update().filter(
+                user_id=user_id, day=day, type__in=types
+            )
+        }
+        merged = aggregate
+        if existing:
+            merged = PartialAggregate.merge_all(
+                [_rows_to_aggregate(list(existing.values())), aggregate]
+            )
+
+        to_update, to_create = [], []
+        for t, values in merged.frame.iterrows():
+            row = existing.get(t)
+            if row is None:
+                row = TypeRollup(user_id=user_id, day=day, type=t)
+                to_create.append(row)
+            else:
+                to_update.append(row)
+            for field in ROLLUP_FIELDS:
+                setattr(row, field, float(values[field]))
+            row.count = int(values["count"])
+
+        TypeRollup.objects.bulk_create(to_create)
+        TypeRollup.objects.bulk_update(to_update, ROLLUP_FIELDS)
+
+
+def forget_upload(upload):
+    """
+    Take a deleted upload out of its day's rollups. Minima and maxima
+    cannot be subtracted, so the day is recomputed from its other uploads.
+    """
+    day = timezone.localdate(upload.uploaded_at)
+    remaining = Upload.objects.filter(user_id=upload.user_id, uploaded_at__date=day)
+    with transaction.atomic():
+        TypeRollup.objects.filter(user_id=upload.user_id, day=day).delete()
+        aggregates = [
+            PartialAggregate.from_dict(data)
+            for data in remaining.values_list("aggregate", flat=True).iterator()
+        ]
+        _merge_into_day(upload.user_id, day, PartialAggregate.merge_all(aggregates))
+
+
+def query_rollups(user, bucket="day", start=None, end=None, types=None):
+    """
+    Pool the daily rollups of ``user`` into ``bucket`` sized periods.
+
+    Returns a list of ``(period_start, PartialAggregate)`` in date order.
+    """
+    queryset = TypeRollup.objects.filter(user=user)
+    if start is not None:
+        queryset = queryset.filter(day__gte=start)
+    if end is not None:
+        queryset = queryset.filter(day__lte=end)
+    if types:
+        queryset = queryset.filter(type__in=types)
+
+    # Aliases must not shadow the model fields used inside the expressions
+    aggregates = {"n": Sum("count")}
+    for m in METRICS:
+        aggregates[f"{m}_total"] = Sum(f"{m}_sum")
+        aggregates[f"{m}_sq"] = Sum(
+            F(f"{m}_m2") + F(f"{m}_sum") * F(f"{m}_sum") / F("count"),
+            output_field=FloatField(),
+        )
+        aggregates[f"{m}_lo"] = Min(f"{m}_min")
+        aggregates[f"{m}_hi"] = Max(f"{m}_max")
+
+    rows = (
+        queryset.annotate(period=BUCKETS[bucket]("day"))
+        .values("period", "type")
+        .annotate(**aggregates)
+        .order_by("period", "type")
+    )
+
+    periods = {}
+    for row in rows:
+        n = float(row["n"])
+        values = {"count": n}
+        for m in METRICS:
+            total = row[f"{m}_total"]
+            values[f"{m}_sum"] = total
+            values[f"{m}_m2"] = max(row[f"{m}_sq"] - total * total / n, 0.0)
+            values[f"{m}_min"] = row[f"{m}_lo"]
+            values[f"{m}_max"] = row[f"{m}_hi"]
+        periods.setdefault(row["period"], {})[row["type"]] = values
+
+    result = []
+    for period, by_type in periods.items():
+        frame = pd.DataFrame.from_dict(by_type, orient="index", dtype="float64")
+        frame.index.name = "type"
+        result.append((period, PartialAggregate(frame[ROLLUP_FIELDS])))
+    return result
+
+
+def rebuild_rollups(user=None):
+    """Recompute rollups from the aggregates stored on every upload."""
+    uploads = Upload.objects.order_by("uploaded_at", "id")
+    rollups = TypeRollup.objects.all()
+    if user is not None:
+        uploads = uploads.filter(user=user)
+        rollups = rollups.filter(user=user)
+
+    with transaction.atomic():
+        rollups.delete()
+        for upload in uploads.only("id", "user_id", "uploaded_at", "aggregate").iterator():
+            record_upload(upload, PartialAggregate.from_dict(upload.aggregate))
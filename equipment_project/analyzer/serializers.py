@@ -1,7 +1,66 @@
 from rest_framework import serializers
-from .models import Upload
+from .models import IngestJob, Upload
+
+# Internal columns of Upload that are never serialized (some are large)
+HEAVY_INTERNAL_FIELDS = ["aggregate", "dataset", "content_hash"]
+
+# Cheap columns shown in upload lists (no JSON fields)
+SUMMARY_FIELDS = [
+    "id", "file_name", "uploaded_at", "total_records",
+    "avg_flowrate", "avg_pressure", "avg_temperature",
+]
+
 
 class UploadSerializer(serializers.ModelSerializer):
+    """Pass ``fields=[...]`` to serialize only a subset of the fields."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Upload
-        fields = "__all__"
+        exclude = HEAVY_INTERNAL_FIELDS
+
+
+class UploadSummarySerializer:
+    """
+    Hand-rolled serializer for the summary fields of many uploads.
+
+    Produces the same values as ``UploadSerializer`` for those fields but
+    skips DRF's per-field machinery, which dominates the cost of long lists.
+    Use it with a queryset restricted by ``.only(*SUMMARY_FIELDS)``.
+    """
+
+    _datetime = serializers.DateTimeField()
+
+    def __init__(self, instance, many=False, fields=None):
+        self.instance = instance
+        self.many = many
+        self.fields = [f for f in SUMMARY_FIELDS if fields is None or f in fields]
+
+    def to_representation(self, upload):
+        row = {}
+        for name in self.fields:
+            value = getattr(upload, name)
+            if name == "uploaded_at":
+                value = self._datetime.to_representation(value)
+            row[name] = value
+        return row
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(upload) for upload in self.instance]
+        return self.to_representation(self.instance)
+
+
+class IngestJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = IngestJob
+        fields = [
+            "id", "file_name", "status", "progress", "rows_processed",
+            "error", "upload", "created_at", "updated_at",
+        ]
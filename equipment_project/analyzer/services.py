@@ -0,0 +1,181 @@
+"""
+Upload processing shared by the synchronous and background code paths.
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from .aggregates import PartialAggregate
+from .compression import DecompressionError, decompressed, detect_compression
+from .ingest import IngestError, build_alias_index, ingest_csv, read_header, resolve_columns
+from .models import Upload
+from .parallel import ingest_parallel
+from .rollups import record_upload
+from .storage import DatasetWriter, new_dataset_path
+
+
+def local_path(fileobj):
+    """Filesystem path of an upload or stored file, if it has one."""
+    if hasattr(fileobj, "temporary_file_path"):
+        return fileobj.temporary_file_path()
+    try:
+        # FieldFile on a local storage backend
+        return fileobj.path
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def _alias_index(aliases):
+    try:
+        return build_alias_index(dict(aliases))
+    except ValueError as exc:
+        raise ImproperlyConfigured(f"CSV_COLUMN_ALIASES: {exc}")
+
+
+def alias_index():
+    """Header alias index including the CSV_COLUMN_ALIASES setting."""
+    aliases = getattr(settings, "CSV_COLUMN_ALIASES", {})
+    return _alias_index(tuple((k, tuple(v)) for k, v in aliases.items()))
+
+
+def check_header(fileobj):
+    """
+    Raise ``IngestError`` unless the file has every required column; only
+    the first line is read and the file is rewound.
+    """
+    try:
+        stream = decompressed(fileobj, settings.MAX_DECOMPRESSED_SIZE)
+        resolve_columns(read_header(stream), alias_index())
+    except DecompressionError as exc:
+        raise IngestError(str(exc))
+    finally:
+        fileobj.seek(0)
+
+
+def ingest(fileobj, progress=None, dataset=None):
+    """
+    Aggregate a CSV file object, in parallel when it is large, on disk and
+    not compressed (compressed streams cannot be split into byte ranges).
+    """
+    path = local_path(fileobj)
+    if (
+        path is not None
+        and settings.INGEST_PROCESSES > 1
+        and os.path.getsize(path) >= settings.PARALLEL_INGEST_MIN_BYTES
+        and detect_compression(fileobj) is None
+    ):
+        return ingest_parallel(
+            path,
+            settings.INGEST_PROCESSES,
+            chunksize=settings.CSV_CHUNK_SIZE,
+            progress=progress,
+            dataset=dataset,
+            parser=settings.CSV_PARSER,
+            alias_index=alias_index(),
+        )
+    return ingest_csv(
+        fileobj,
+        chunksize=settings.CSV_CHUNK_SIZE,
+        progress=progress,
+        dataset=dataset,
+        max_size=settings.MAX_DECOMPRESSED_SIZE,
+        parser=settings.CSV_PARSER,
+        alias_index=alias_index(),
+    )
+
+
+def file_digest(fileobj):
+    """BLAKE2b hex digest of a file object's content; the file is rewound."""
+    # Computed while streaming by uploadhandlers.HashingFileUploadHandler
+    content_hash = getattr(fileobj, "content_hash", None)
+    if content_hash:
+        return content_hash
+
+    digest = hashlib.blake2b(digest_size=32)
+    if hasattr(fileobj, "chunks"):
+        for chunk in fileobj.chunks():
+            digest.update(chunk)
+    else:
+        fileobj.seek(0)
+        for block in iter(lambda: fileobj.read(1 << 20), b""):
+            digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def find_duplicate(user, content_hash):
+    """
+    The latest upload of ``user`` processed from the same bytes, if any.
+    Never another user's: a cache hit would reveal what they uploaded.
+    """
+    return (
+        Upload.objects.filter(user=user, content_hash=content_hash)
+        .exclude(aggregate={})
+        .order_by("-id")
+        .first()
+    )
+
+
+# Fields copied from an earlier upload of the same content
+CLONED_FIELDS = [
+    "total_records", "avg_flowrate", "avg_pressure", "avg_temperature",
+    "type_distribution", "per_type_stats", "aggregate", "dataset", "content_hash",
+]
+
+
+def cloned_fields(source):
+    return {field: getattr(source, field) for field in CLONED_FIELDS}
+
+
+def clone_upload(source, user, file_name):
+    """Store the results of ``source`` as a new upload without parsing."""
+    with transaction.atomic():
+        upload = Upload.objects.create(user=user, file_name=file_name, **cloned_fields(source))
+        record_upload(upload, PartialAggregate.from_dict(source.aggregate))
+    return upload
+
+
+def process_upload(user, file_name, fileobj, progress=None, content_hash=None):
+    """
+    Ingest a CSV file object and store the resulting ``Upload``.
+
+    ``content_hash`` is the ``file_digest`` of the file when already known.
+    Returns ``(upload, cached)``; ``cached`` is True when the user uploaded
+    identical bytes before and their results were reused without parsing.
+    """
+    content_hash = content_hash or file_digest(fileobj)
+    if settings.UPLOAD_DEDUP_CACHE:
+        source = find_duplicate(user, content_hash)
+        if source is not None:
+            return clone_upload(source, user, file_name), True
+
+    dataset_path = ""
+    writer = None
+    if settings.PERSIST_DATASETS:
+        dataset_path = new_dataset_path()
+        writer = DatasetWriter(os.path.join(settings.MEDIA_ROOT, dataset_path))
+
+    try:
+        aggregate = ingest(fileobj, progress=progress, dataset=writer)
+        if writer is not None:
+            writer.close()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    with transaction.atomic():
+        upload = Upload.objects.create(
+            user=user,
+            file_name=file_name,
+            dataset=dataset_path,
+            content_hash=content_hash,
+            **aggregate.upload_fields(),
+        )
+        record_upload(upload, aggregate)
+    return upload, False
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_upload
+from .models import Upload
+from .rendering import delete_charts
+from .rollups import forget_upload
+from .storage import delete_dataset
+
+
+@receiver(post_save, sender=Upload)
+def upload_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_upload(instance)
+
+
+@receiver(post_delete, sender=Upload)
+def upload_deleted(sender, instance, **kwargs):
+    invalidate_upload(instance)
+    delete_charts(instance.pk)
+    forget_upload(instance)
+    if instance.dataset:
+        transaction.on_commit(lambda: release_dataset(instance.dataset))
+
+
+def release_dataset(path):
+    """Delete a dataset once no upload uses it (clones of identical files share one)."""
+    if not Upload.objects.filter(dataset=path).exists():
+        delete_dataset(settings.MEDIA_ROOT, path)
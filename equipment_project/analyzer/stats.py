@@ -0,0 +1,94 @@
+"""
+Vectorized statistics over equipment metrics.
+
+Per-type statistics are computed with a single ``groupby().agg()`` call and
+everything else (overall stats, the stored payloads) is derived from those
+per-type rows instead of making more passes over the data. Merging is left
+to ``analyzer.aggregates``.
+
+A group frame is indexed by type and has a ``count`` column plus one
+``<metric>_<stat>`` column per metric and stat, e.g. ``pressure_var``.
+"""
+import pandas as pd
+
+METRICS = ("flowrate", "pressure", "temperature")
+STATS = ("mean", "min", "max", "var")
+
+
+def stat_columns(metrics=METRICS):
+    return ["count"] + [f"{m}_{s}" for m in metrics for s in STATS]
+
+
+def empty_stats(metrics=METRICS):
+    return pd.DataFrame(
+        {col: pd.Series(dtype="float64") for col in stat_columns(metrics)},
+        index=pd.Index([], name="type"),
+    )
+
+
+def group_stats(df, metrics=METRICS):
+    """Count, mean, min, max and sample variance of every metric per type."""
+    metrics = list(metrics)
+    if df.empty:
+        return empty_stats(metrics)
+
+    aggs = {"count": (metrics[0], "size")}
+    for m in metrics:
+        for s in STATS:
+            aggs[f"{m}_{s}"] = (m, s)
+
+    grouped = df.groupby("type", sort=False, observed=True)
+    stats = grouped.agg(**aggs)
+    stats["count"] = stats["count"].astype("float64")
+    return stats
+
+
+def overall_stats(groups, metrics=METRICS):
+    """Whole-dataset stats derived from the per-type partials."""
+    total = float(groups["count"].sum())
+    overall = {"count": int(total)}
+
+    for m in metrics:
+        if not total:
+            overall.update({f"{m}_{s}": 0.0 for s in STATS})
+            continue
+        count = groups["count"]
+        mean = float((groups[f"{m}_mean"] * count).sum() / total)
+        m2 = (groups[f"{m}_var"] * (count - 1)).fillna(0.0).sum()
+        m2 += float((count * (groups[f"{m}_mean"] - mean) ** 2).sum())
+        overall[f"{m}_mean"] = mean
+        overall[f"{m}_min"] = float(groups[f"{m}_min"].min())
+        overall[f"{m}_max"] = float(groups[f"{m}_max"].max())
+        overall[f"{m}_var"] = float(m2 / (total - 1)) if total > 1 else float("nan")
+
+    return overall
+
+
+def type_distribution(groups):
+    counts = groups["count"].sort_values(ascending=False, kind="stable")
+    return {t: int(n) for t, n in counts.items()}
+
+
+def per_type_stats(groups, metrics=METRICS):
+    """The ``Upload.per_type_stats`` representation of a group frame."""
+    groups = groups.sort_index()
+    records = {"count": groups["count"].astype("int64").tolist()}
+    for m in metrics:
+        records[f"avg_{m}"] = groups[f"{m}_mean"].astype("float64").tolist()
+
+    keys = list(records)
+    return {
+        t: dict(zip(keys, row))
+        for t, row in zip(groups.index, zip(*records.values()))
+    }
+
+
+def upload_stats(groups, metrics=METRICS):
+    """Everything ``Upload`` stores, computed from a group frame."""
+    overall = overall_stats(groups, metrics)
+    return {
+        "total_records": overall["count"],
+        **{f"avg_{m}": overall[f"{m}_mean"] for m in metrics},
+        "type_distribution": type_distribution(groups),
+        "per_type_stats": per_type_stats(groups, metrics),
+    }
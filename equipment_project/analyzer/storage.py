@@ -0,0 +1,253 @@
+"""
+Columnar on-disk storage of cleaned uploads.
+
+A dataset is a directory under ``MEDIA_ROOT/datasets/`` made of one or more
+parts (one per parallel ingest range). Inside a part every column is a flat
+little-endian binary file that NumPy memory-maps directly, so re-analysis
+reads only the columns it needs and never re-parses the CSV. The type column
+is dictionary encoded: an int32 code column plus a JSON list of the distinct
+values. Equipment names are mostly unique, so they are stored as they are:
+the UTF-8 bytes of all names back to back plus an int64 column of where each
+one ends. Writers keep no per-value state, so their memory does not grow with
+the number of rows.
+
+    datasets/<id>/meta.json
+    datasets/<id>/part-00000/flowrate.bin
+    datasets/<id>/part-00000/type.bin
+    datasets/<id>/part-00000/type.json
+    datasets/<id>/part-00000/equipment.bin
+    datasets/<id>/part-00000/equipment.idx
+    ...
+
+Version 1 datasets, which dictionary encoded equipment names too, are still
+readable.
+
+``meta.json`` also records per-part min/max of every metric so readers can
+skip whole parts that cannot match a range filter.
+"""
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .stats import METRICS
+
+CATEGORICAL = ("type",)
+STRINGS = ("equipment",)
+COLUMNS = CATEGORICAL + STRINGS + METRICS
+FORMAT_VERSION = 2
+
+# For string columns, the dtype of the end offsets
+DTYPES = {column: "<i4" for column in CATEGORICAL}
+DTYPES.update({column: "<i8" for column in STRINGS})
+DTYPES.update({metric: "<f8" for metric in METRICS})
+
+
+def new_dataset_path():
+    """A fresh dataset location, relative to MEDIA_ROOT."""
+    return f"datasets/{uuid.uuid4().hex}"
+
+
+def delete_dataset(media_root, relative_path):
+    shutil.rmtree(os.path.join(media_root, relative_path), ignore_errors=True)
+
+
+# -----------------------------
+# WRITING
+# -----------------------------
+class PartWriter:
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+        self.files = {c: open(os.path.join(path, f"{c}.bin"), "wb") for c in COLUMNS}
+        self.offsets = {c: open(os.path.join(path, f"{c}.idx"), "wb") for c in STRINGS}
+        self.string_bytes = {c: 0 for c in STRINGS}
+        self.dictionaries = {c: {} for c in CATEGORICAL}
+        self.ranges = {m: [np.inf, -np.inf] for m in METRICS}
+
+    def _encode(self, column, values):
+        mapping = self.dictionaries[column]
+        cat = pd.Categorical(values.astype(str))
+        lookup = np.empty(len(cat.categories), dtype=DTYPES[column])
+        for i, value in enumerate(cat.categories):
+            code = mapping.get(value)
+            if code is None:
+                code = mapping[value] = len(mapping)
+            lookup[i] = code
+        return lookup[cat.codes]
+
+    def _write_strings(self, column, values):
+        encoded = [value.encode() for value in values.astype(str)]
+        ends = np.cumsum([len(value) for value in encoded], dtype=DTYPES[column])
+        ends += self.string_bytes[column]
+        self.files[column].write(b"".join(encoded))
+        ends.tofile(self.offsets[column])
+        self.string_bytes[column] = int(ends[-1])
+
+    def append(self, df):
+        """Append a cleaned chunk (standard column names, no missing values)."""
+        if df.empty:
+            return
+        for column in CATEGORICAL:
+            self._encode(column, df[column]).tofile(self.files[column])
+        for column in STRINGS:
+            self._write_strings(column, df[column])
+        for metric in METRICS:
+            values = df[metric].to_numpy(dtype=DTYPES[metric])
+            values.tofile(self.files[metric])
+            bounds = self.ranges[metric]
+            bounds[0] = min(bounds[0], float(values.min()))
+            bounds[1] = max(bounds[1], float(values.max()))
+        self.rows += len(df)
+
+    def close(self):
+        """Flush the part and return its entry for ``meta.json``."""
+        for f in [*self.files.values(), *self.offsets.values()]:
+            f.close()
+        for column, mapping in self.dictionaries.items():
+            with open(os.path.join(self.path, f"{column}.json"), "w") as f:
+                json.dump(list(mapping), f)
+        return {
+            "name": os.path.basename(self.path),
+            "rows": self.rows,
+            "ranges": {m: b if self.rows else None for m, b in self.ranges.items()},
+        }
+
+
+class DatasetWriter:
+    def __init__(self, path):
+        self.path = path
+        self.parts = []
+        os.makedirs(path, exist_ok=True)
+
+    def part_path(self, index):
+        return os.path.join(self.path, f"part-{index:05d}")
+
+    def open_part(self, index=None):
+        if index is None:
+            index = len(self.parts)
+        return PartWriter(self.part_path(index))
+
+    def add_part(self, meta):
+        self.parts.append(meta)
+
+    def close(self):
+        parts = sorted(self.parts, key=lambda p: p["name"])
+        meta = {
+            "version": FORMAT_VERSION,
+            "rows": sum(p["rows"] for p in parts),
+            "columns": DTYPES,
+            "parts": parts,
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return meta
+
+    def abort(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def reset(self):
+        """Drop the parts written so far and start again."""
+        self.abort()
+        os.makedirs(self.path)
+        self.parts = []
+
+
+# -----------------------------
+# READING
+# -----------------------------
+class Part:
+    def __init__(self, path, meta, version=FORMAT_VERSION):
+        self.path = path
+        self.name = meta["name"]
+        self.rows = meta["rows"]
+        self.ranges = meta["ranges"]
+        self.version = version
+
+    def column(self, name):
+        """Memory-mapped values (dictionary codes, string end offsets) of one column."""
+        dtype = DTYPES[name]
+        suffix = "idx" if name in STRINGS else "bin"
+        if self.version < 2 and name in STRINGS:
+            dtype, suffix = "<i4", "bin"
+        if not self.rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            os.path.join(self.path, f"{name}.{suffix}"),
+            dtype=dtype,
+            mode="r",
+            shape=(self.rows,),
+        )
+
+    def categories(self, name):
+        with open(os.path.join(self.path, f"{name}.json")) as f:
+            return json.load(f)
+
+    def strings(self, name):
+        """The values of a string column as an object array."""
+        if self.version < 2:
+            return np.asarray(self.categories(name), dtype=object)[self.column(name)]
+        ends = self.column(name)
+        with open(os.path.join(self.path, f"{name}.bin"), "rb") as f:
+            data = f.read()
+        values = np.empty(self.rows, dtype=object)
+        start = 0
+        for i, end in enumerate(ends.tolist()):
+            values[i] = data[start:end].decode()
+            start = end
+        return values
+
+    def read(self, columns=COLUMNS):
+        data = {}
+        for name in columns:
+            if name in CATEGORICAL:
+                data[name] = pd.Categorical.from_codes(self.column(name), self.categories(name))
+            elif name in STRINGS:
+                data[name] = self.strings(name)
+            else:
+                data[name] = self.column(name)
+        return pd.DataFrame(data)
+
+
+def _empty_dtype(column):
+    if column in CATEGORICAL:
+        return "category"
+    if column in STRINGS:
+        return object
+    return DTYPES[column]
+
+
+class Dataset:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+
+    @classmethod
+    def open(cls, media_root, relative_path):
+        return cls(os.path.join(media_root, relative_path))
+
+    def parts(self):
+        version = self.meta["version"]
+        return [Part(os.path.join(self.path, p["name"]), p, version) for p in self.meta["parts"]]
+
+    def read(self, columns=COLUMNS):
+        """Load the given columns of every part into one DataFrame."""
+        frames = [part.read(columns) for part in self.parts()]
+        if not frames:
+            return pd.DataFrame({c: pd.Series(dtype=_empty_dtype(c)) for c in columns})
+        if len(frames) == 1:
+            return frames[0]
+        data = {}
+        for name in columns:
+            if name in CATEGORICAL:
+                data[name] = union_categoricals([f[name] for f in frames])
+            else:
+                data[name] = np.concatenate([f[name].to_numpy() for f in frames])
+        return pd.DataFrame(data)
@@ -1,3 +1,1014 @@
-from django.test import TestCase
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .aggregates import PartialAggregate
+from . import ingest as ingest_module
+from .ingest import DEFAULT_CHUNK_SIZE, IngestError, build_alias_index, ingest_csv, read_header
+from .jobs import run_pending
+from .models import IngestJob, TypeRollup, Upload, UploadSession
+from .parallel import get_pool, ingest_parallel, split_ranges
+from .resumable import finalize_session, purge_expired
+from .serializers import SUMMARY_FIELDS, UploadSerializer, UploadSummarySerializer
+from .services import alias_index, check_header, process_upload
+from .storage import Dataset, DatasetWriter
+
+HEADER = "Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+
+
+def make_csv(rows=1000, seed=0):
+    """A CSV with the usual columns and ``rows`` random rows."""
+    rng = np.random.default_rng(seed)
+    types = rng.choice(["Pump", "Valve", "Reactor"], rows)
+    lines = [HEADER]
+    for i in range(rows):
+        lines.append(
+            f"EQ-{i},{types[i]},{rng.normal(120, 30):.3f},"
+            f"{rng.normal(6, 1.5):.3f},{rng.normal(110, 25):.3f}\n"
+        )
+    return "".join(lines).encode()
+
+
+def reference_frame(data):
+    """The CSV parsed in one go, renamed to the standard columns."""
+    df = pd.read_csv(io.BytesIO(data))
+    df.columns = ["equipment", "type", "flowrate", "pressure", "temperature"]
+    return df
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="secret")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class MediaTestCase(ApiTestCase):
+    """An ApiTestCase whose MEDIA_ROOT is a fresh temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(
+            MEDIA_ROOT=self.media_root, UPLOAD_TEMP_DIR=os.path.join(self.media_root, "tmp")
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, data, name="data.csv", user=None):
+        upload, _ = process_upload(user or self.user, name, ContentFile(data, name=name))
+        return upload
+
+
+# -----------------------------
+# PARTIAL AGGREGATES
+# -----------------------------
+class PartialAggregateTests(SimpleTestCase):
+    def setUp(self):
+        self.df = reference_frame(make_csv(500))
+
+    def assertSameAggregate(self, a, b):
+        pd.testing.assert_frame_equal(
+            a.frame.sort_index(), b.frame.sort_index(), check_exact=False, rtol=1e-9
+        )
+
+    def test_merge_matches_single_pass(self):
+        whole = PartialAggregate.from_frame(self.df)
+        pieces = [self.df.iloc[i:i + 70] for i in range(0, len(self.df), 70)]
+        merged = PartialAggregate.merge_all(PartialAggregate.from_frame(p) for p in pieces)
+        self.assertSameAggregate(merged, whole)
+
+    def test_pairwise_merge_matches_merge_all(self):
+        a = PartialAggregate.from_frame(self.df.iloc[:123])
+        b = PartialAggregate.from_frame(self.df.iloc[123:])
+        self.assertSameAggregate(a.merge(b), PartialAggregate.merge_all([a, b]))
+
+    def test_merge_with_empty(self):
+        whole = PartialAggregate.from_frame(self.df)
+        self.assertSameAggregate(PartialAggregate().merge(whole), whole)
+        self.assertEqual(PartialAggregate.merge_all([]).count, 0)
+
+    def test_variance_matches_pandas(self):
+        groups = PartialAggregate.from_frame(self.df.iloc[:250]).merge(
+            PartialAggregate.from_frame(self.df.iloc[250:])
+        ).groups()
+        expected = self.df.groupby("type")["pressure"].var()
+        np.testing.assert_allclose(groups["pressure_var"].sort_index(), expected.sort_index())
+
+    def test_from_codes_matches_from_frame(self):
+        cat = pd.Categorical(self.df["type"])
+        values = {m: self.df[m].to_numpy() for m in ("flowrate", "pressure", "temperature")}
+        from_codes = PartialAggregate.from_codes(cat.codes, list(cat.categories), values)
+        self.assertSameAggregate(from_codes, PartialAggregate.from_frame(self.df))
+
+    def test_dict_round_trip(self):
+        aggregate = PartialAggregate.from_frame(self.df)
+        self.assertSameAggregate(PartialAggregate.from_dict(aggregate.to_dict()), aggregate)
+
+
+# -----------------------------
+# CHUNKED INGESTION
+# -----------------------------
+class IngestCsvTests(SimpleTestCase):
+    def test_chunk_size_does_not_change_the_result(self):
+        data = make_csv(1000)
+        whole = ingest_csv(io.BytesIO(data), chunksize=10_000)
+        chunked = ingest_csv(io.BytesIO(data), chunksize=37)
+        self.assertEqual(chunked.count, 1000)
+        pd.testing.assert_frame_equal(
+            chunked.frame.sort_index(), whole.frame.sort_index(), check_exact=False, rtol=1e-9
+        )
+
+    def test_matches_pandas_means(self):
+        data = make_csv(300)
+        stats = ingest_csv(io.BytesIO(data), chunksize=50).upload_fields()
+        df = reference_frame(data)
+        self.assertEqual(stats["total_records"], 300)
+        self.assertAlmostEqual(stats["avg_flowrate"], df["flowrate"].mean(), places=6)
+        self.assertEqual(stats["type_distribution"], df["type"].value_counts().to_dict())
+
+    def test_only_unusable_rows_are_dropped(self):
+        data = (
+            "Equipment Name,Type,Flowrate,Pressure,Temperature,Notes\n"
+            "P-1,Pump,10,2,100,\n"
+            "P-2,Pump,n/a,2,100,note\n"
+            "V-1,Valve,5,1,50,\n"
+        ).encode()
+        aggregate = ingest_csv(io.BytesIO(data))
+        self.assertEqual(aggregate.count, 2)
+        self.assertEqual(sorted(aggregate.frame.index), ["Pump", "Valve"])
+
+    def test_header_aliases(self):
+        data = b"equipment,type,flow rate,PRESSURE,temp\nP-1,Pump,1,2,3\n"
+        self.assertEqual(ingest_csv(io.BytesIO(data)).count, 1)
+
+    def test_missing_column(self):
+        with self.assertRaisesMessage(IngestError, "Missing required column 'pressure'"):
+            ingest_csv(io.BytesIO(b"Equipment Name,Type,Flowrate\nP-1,Pump,1\n"))
+
+    def test_unreadable_header(self):
+        for data in (b"", b"\n  \n\r\n", b"\xff\xfeE,T\n"):
+            with self.assertRaisesMessage(IngestError, "Could not read CSV header"):
+                ingest_csv(io.BytesIO(data))
+
+    def test_blank_lines_before_the_header_are_skipped(self):
+        data = b"\xef\xbb\xbf\n  \r\n" + make_csv(100)
+        self.assertEqual(read_header(io.BytesIO(data)), next(csv.reader([HEADER])))
+        for parser in ("c", "pyarrow"):
+            self.assertEqual(ingest_csv(io.BytesIO(data), parser=parser).count, 100, parser)
+
+
+class ColumnAliasTests(SimpleTestCase):
+    DATA = b"Tag,Kind,Flow (m3/h),Pressure,Temp\nP-1,Pump,1,2,3\n"
+
+    @override_settings(CSV_COLUMN_ALIASES={"equipment": ["Tag"], "type": ["kind"],
+                                           "flowrate": ["FLOW(m3/h)"]})
+    def test_setting_adds_spellings(self):
+        aggregate = ingest_csv(io.BytesIO(self.DATA), alias_index=alias_index())
+        self.assertEqual(aggregate.count, 1)
+        check_header(io.BytesIO(self.DATA))
+
+    def test_setting_is_required_for_them(self):
+        with self.assertRaisesMessage(IngestError, "Missing required column 'equipment'"):
+            check_header(io.BytesIO(self.DATA))
+
+    def test_conflicts_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, "maps to both 'temperature' and 'pressure'"):
+            build_alias_index({"pressure": ["Temp"]})
+        with self.assertRaisesMessage(ValueError, "Unknown standard column 'speed'"):
+            build_alias_index({"speed": ["v"]})
+        with override_settings(CSV_COLUMN_ALIASES={"type": ["flow rate"]}):
+            with self.assertRaises(ImproperlyConfigured):
+                alias_index()
+
+
+# -----------------------------
+# PARSER BACKENDS
+# -----------------------------
+MESSY_CSV = (
+    "Equipment Name,Type,Flowrate,Pressure,Temperature,Notes\n"
+    "P-1,Pump,10,2,100,ok\n"
+    "P-2,Pump,11,2.5,101\n"                  # no notes: kept
+    "P-3,Pump,12,3\n"                        # no temperature: dropped
+    "P-4,Pump,13,3,102,a,b,c\n"              # extra fields: ignored
+    "V-1,Valve,inf,1,50,\n"
+    "V-2,Valve, 7 ,-Infinity,51,\n"
+    "V-3,Valve,abc,1,52,\n"
+    "V-4,Valve,NA,1,53,\n"
+    "\n"
+    "R-1,Reactor,1e3,\"4\",+.5,\"quoted, comma\"\n"
+    "R-2,N/A,1,1,1,\n"
+    ",Reactor,1,1,1,\n"
+).encode()
+
+
+@skipUnless(ingest_module.pa is not None, "pyarrow is not installed")
+class ParserParityTests(SimpleTestCase):
+    def assertParsersAgree(self, data, chunksize=DEFAULT_CHUNK_SIZE):
+        c = ingest_csv(io.BytesIO(data), chunksize=chunksize, parser="c")
+        arrow = ingest_csv(io.BytesIO(data), chunksize=chunksize, parser="pyarrow")
+        self.assertEqual(arrow.count, c.count)
+        pd.testing.assert_frame_equal(
+            arrow.frame.sort_index(), c.frame.sort_index(), check_exact=False, rtol=1e-9
+        )
+        return c
+
+    def test_clean_file(self):
+        self.assertEqual(self.assertParsersAgree(make_csv(500), chunksize=100).count, 500)
+
+    def test_messy_file(self):
+        aggregate = self.assertParsersAgree(MESSY_CSV)
+        self.assertEqual(aggregate.count, 6)
+        self.assertEqual(aggregate.frame.loc["Pump", "count"], 3)
+
+    def test_ragged_rows_across_chunks(self):
+        lines = make_csv(3000).decode().splitlines(keepends=True)
+        for i in range(1, len(lines), 7):
+            lines[i] = lines[i].rstrip("\n") + (",extra\n" if i % 2 else "\n")
+        for i in range(3, len(lines), 11):
+            lines[i] = lines[i].rsplit(",", 1)[0] + "\n"
+        self.assertParsersAgree("".join(lines).encode(), chunksize=100)
+
+    def test_stored_rows_match(self):
+        frames = []
+        for parser in ("c", "pyarrow"):
+            path = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+            writer = DatasetWriter(path)
+            ingest_csv(io.BytesIO(MESSY_CSV), dataset=writer, parser=parser)
+            writer.close()
+            frame = Dataset(path).read().astype({"type": str})
+            frames.append(frame.sort_values("equipment").reset_index(drop=True))
+        pd.testing.assert_frame_equal(frames[1], frames[0])
+
+
+# -----------------------------
+# COMPRESSED UPLOADS
+# -----------------------------
+class CompressedIngestTests(SimpleTestCase):
+    def setUp(self):
+        self.data = make_csv(400)
+        self.plain = ingest_csv(io.BytesIO(self.data), chunksize=64)
+
+    def test_gzip_and_bz2_match_plain_csv(self):
+        for compressed in (gzip.compress(self.data), bz2.compress(self.data)):
+            aggregate = ingest_csv(io.BytesIO(compressed), chunksize=64)
+            pd.testing.assert_frame_equal(aggregate.frame, self.plain.frame)
+
+    def test_corrupt_or_truncated_input(self):
+        compressed = gzip.compress(self.data)
+        for bad in (compressed[:len(compressed) // 2], compressed[:20] + b"x" * 50):
+            with self.assertRaises(IngestError):
+                ingest_csv(io.BytesIO(bad))
+
+    def test_decompressed_size_limit(self):
+        with self.assertRaises(IngestError):
+            ingest_csv(io.BytesIO(gzip.compress(self.data)), max_size=len(self.data) // 2)
+
+
+# -----------------------------
+# PARALLEL INGESTION
+# -----------------------------
+class ParallelIngestTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir, ignore_errors=True)
+        self.path = os.path.join(self.workdir, "data.csv")
+        with open(self.path, "wb") as f:
+            f.write(make_csv(2000))
+
+    def test_ranges_are_line_aligned_and_cover_the_body(self):
+        ranges = split_ranges(self.path, 7)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self.assertEqual(ranges[0][0], len(HEADER))
+        self.assertEqual(ranges[-1][1], len(data))
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[start - 1:start], b"\n")
+
+    def test_blank_lines_before_the_header(self):
+        with open(self.path, "wb") as f:
+            f.write(b"\n\n" + make_csv(2000))
+        self.assertEqual(split_ranges(self.path, 3)[0][0], 2 + len(HEADER))
+        self.assertEqual(ingest_parallel(self.path, 3, chunksize=300).count, 2000)
+
+    def test_matches_streaming_path(self):
+        with open(self.path, "rb") as f:
+            streamed = ingest_csv(f, chunksize=300)
+        writer = DatasetWriter(os.path.join(self.workdir, "dataset"))
+        parallel = ingest_parallel(self.path, 3, chunksize=300, dataset=writer)
+        writer.close()
+
+        pd.testing.assert_frame_equal(
+            parallel.frame.sort_index(), streamed.frame.sort_index(), check_exact=False, rtol=1e-9
+        )
+        dataset = Dataset(os.path.join(self.workdir, "dataset"))
+        self.assertEqual(len(dataset.parts()), 3)
+        self.assertEqual(len(dataset.read()), 2000)
+
+    @skipUnless(ingest_module.pa is not None, "pyarrow is not installed")
+    def test_pyarrow_matches_streaming_path(self):
+        lines = make_csv(2000).decode().splitlines(keepends=True)
+        for i in range(5, len(lines), 13):
+            lines[i] = lines[i].rstrip("\n") + ",extra\n"
+        with open(self.path, "w") as f:
+            f.write("".join(lines))
+        with open(self.path, "rb") as f:
+            streamed = ingest_csv(f, chunksize=300, parser="c")
+        parallel = ingest_parallel(self.path, 3, chunksize=300, parser="pyarrow")
+        self.assertEqual(parallel.count, 2000)
+        pd.testing.assert_frame_equal(
+            parallel.frame.sort_index(), streamed.frame.sort_index(), check_exact=False, rtol=1e-9
+        )
+
+    def test_quoted_line_breaks_fall_back_to_streaming(self):
+        # Names spanning many lines, so range boundaries land inside quotes
+        data = make_csv(300).replace(b"EQ-", b'"EQ' + b"\n-" * 20)
+        data = data.replace(b",Pump,", b'",Pump,').replace(b",Valve,", b'",Valve,')
+        data = data.replace(b",Reactor,", b'",Reactor,')
+        with open(self.path, "wb") as f:
+            f.write(data)
+        starts = [start for start, _ in split_ranges(self.path, 3)[1:]]
+        self.assertTrue(any(data[:start].count(b'"') % 2 for start in starts))
+
+        with open(self.path, "rb") as f:
+            streamed = ingest_csv(f, chunksize=50)
+        writer = DatasetWriter(os.path.join(self.workdir, "dataset"))
+        parallel = ingest_parallel(self.path, 3, chunksize=50, dataset=writer)
+        writer.close()
+
+        self.assertEqual(parallel.to_dict(), streamed.to_dict())
+        frame = Dataset(os.path.join(self.workdir, "dataset")).read()
+        self.assertEqual(len(frame), 300)
+        self.assertTrue(frame["equipment"].str.contains("\n").all())
+
+    def test_broken_pool_is_replaced(self):
+        pool = get_pool(3)
+        with self.assertRaises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+
+        with self.assertRaisesMessage(IngestError, "stopped unexpectedly"):
+            ingest_parallel(self.path, 3, chunksize=300)
+        self.assertIsNot(get_pool(3), pool)
+        self.assertEqual(ingest_parallel(self.path, 3, chunksize=300).count, 2000)
+
+
+# -----------------------------
+# COLUMNAR STORAGE
+# -----------------------------
+class StorageTests(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+
+    def test_round_trip(self):
+        df = pd.DataFrame({
+            "type": ["Pump", "Valve", "Pump"],
+            "equipment": ["P-1", "Vanne n°2", ""],
+            "flowrate": [1.0, 2.0, 3.0],
+            "pressure": [4.0, 5.0, 6.0],
+            "temperature": [7.0, 8.0, 9.0],
+        })
+        writer = DatasetWriter(self.path)
+        part = writer.open_part()
+        part.append(df.iloc[:2])
+        part.append(df.iloc[2:])
+        writer.add_part(part.close())
+        writer.close()
+
+        frame = Dataset(self.path).read()
+        self.assertEqual(frame["equipment"].tolist(), df["equipment"].tolist())
+        self.assertEqual(frame["type"].tolist(), df["type"].tolist())
+        np.testing.assert_array_equal(frame["pressure"], df["pressure"])
+        self.assertFalse(os.path.exists(os.path.join(self.path, "part-00000", "equipment.json")))
+
+    def test_reads_version_1(self):
+        part = os.path.join(self.path, "part-00000")
+        os.makedirs(part)
+        columns = {
+            "type": (["Pump", "Valve"], [1, 0]),
+            "equipment": (["P-1", "V-1"], [1, 0]),
+        }
+        for name, (categories, codes) in columns.items():
+            np.array(codes, dtype="<i4").tofile(os.path.join(part, f"{name}.bin"))
+            with open(os.path.join(part, f"{name}.json"), "w") as f:
+                json.dump(categories, f)
+        for metric in ("flowrate", "pressure", "temperature"):
+            np.array([1.0, 2.0]).tofile(os.path.join(part, f"{metric}.bin"))
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"version": 1, "rows": 2, "parts": [
+                {"name": "part-00000", "rows": 2, "ranges": {}},
+            ]}, f)
+
+        frame = Dataset(self.path).read()
+        self.assertEqual(frame["equipment"].tolist(), ["V-1", "P-1"])
+        self.assertEqual(frame["type"].tolist(), ["Valve", "Pump"])
+
+
+# -----------------------------
+# BACKGROUND JOBS
+# -----------------------------
+class IngestJobTests(MediaTestCase):
+    def make_job(self, status, age):
+        job = IngestJob.objects.create(
+            user=self.user, file=ContentFile(make_csv(20), name="x.csv"),
+            file_name="x.csv", status=status,
+        )
+        IngestJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - age)
+        return job
+
+    def test_run_pending_processes_queued_jobs(self):
+        job = self.make_job(IngestJob.QUEUED, timedelta(0))
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.DONE)
+        self.assertEqual(job.upload.total_records, 20)
+
+    @override_settings(INGEST_JOB_TIMEOUT=60)
+    def test_stale_running_job_is_requeued(self):
+        stale = self.make_job(IngestJob.RUNNING, timedelta(minutes=5))
+        active = self.make_job(IngestJob.RUNNING, timedelta(seconds=10))
+        with self.assertLogs("analyzer.jobs", "WARNING"):
+            self.assertEqual(run_pending(), 1)
+        stale.refresh_from_db()
+        active.refresh_from_db()
+        self.assertEqual(stale.status, IngestJob.DONE)
+        self.assertEqual(active.status, IngestJob.RUNNING)
+
+
+# -----------------------------
+# STORED DATASETS
+# -----------------------------
+class DatasetLifecycleTests(MediaTestCase):
+    def dataset_exists(self, upload):
+        return os.path.isdir(os.path.join(self.media_root, upload.dataset))
+
+    def test_dataset_is_written(self):
+        upload = self.upload(make_csv(50))
+        self.assertTrue(self.dataset_exists(upload))
+        self.assertEqual(len(Dataset.open(self.media_root, upload.dataset).read()), 50)
+
+    def test_shared_dataset_is_deleted_with_its_last_upload(self):
+        first = self.upload(make_csv(50))
+        clone = self.upload(make_csv(50), "again.csv")
+        self.assertEqual(clone.dataset, first.dataset)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(self.dataset_exists(clone))
+        with self.captureOnCommitCallbacks(execute=True):
+            clone.delete()
+        self.assertFalse(self.dataset_exists(clone))
+        self.assertFalse(Upload.objects.exists())
+
+
+# -----------------------------
+# RE-ANALYSIS
+# -----------------------------
+class AnalyzeTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = make_csv(500, seed=3)
+        self.upload_obj = self.upload(self.data)
+        self.url = f"/api/uploads/{self.upload_obj.pk}/analyze/"
+
+    def assertMatchesPandas(self, result, df):
+        stats = result["overall_stats"]
+        self.assertEqual(stats["total_records"], len(df))
+        for metric in ("flowrate", "pressure", "temperature"):
+            self.assertAlmostEqual(stats[f"avg_{metric}"], df[metric].mean())
+        expected = df.groupby("type").agg(count=("pressure", "size"), avg=("pressure", "mean"))
+        self.assertEqual(sorted(result["per_type_stats"]), sorted(expected.index))
+        for type_, row in expected.iterrows():
+            per_type = result["per_type_stats"][type_]
+            self.assertEqual(per_type["count"], row["count"])
+            self.assertAlmostEqual(per_type["avg_pressure"], row["avg"])
+
+    def test_filters_match_pandas(self):
+        df = reference_frame(self.data)
+        response = self.client.get(self.url, {
+            "types": "Pump,Valve", "pressure_min": "5", "temperature_max": "120",
+        })
+        self.assertEqual(response.status_code, 200)
+        expected = df[
+            df["type"].isin(["Pump", "Valve"]) & (df["pressure"] >= 5) & (df["temperature"] <= 120)
+        ]
+        self.assertMatchesPandas(response.data, expected)
+        self.assertEqual(response.data["filters"], {
+            "types": ["Pump", "Valve"], "pressure_min": 5.0, "pressure_max": None,
+            "temperature_min": None, "temperature_max": 120.0,
+        })
+
+    def test_post_body_filters(self):
+        df = reference_frame(self.data)
+        response = self.client.post(self.url, {
+            "types": ["Reactor"], "flowrate_min": 100, "flowrate_max": 150,
+        }, format="json")
+        self.assertEqual(response.status_code, 200)
+        expected = df[
+            (df["type"] == "Reactor") & df["flowrate"].between(100, 150)
+        ]
+        self.assertMatchesPandas(response.data, expected)
+
+    def test_no_match(self):
+        response = self.client.get(self.url, {"types": "Compressor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["overall_stats"]["total_records"], 0)
+        self.assertEqual(response.data["per_type_stats"], {})
+
+    def test_upload_without_dataset(self):
+        Upload.objects.filter(pk=self.upload_obj.pk).update(dataset="")
+        self.assertEqual(self.client.get(self.url).status_code, 409)
+
+    def test_missing_dataset_directory(self):
+        shutil.rmtree(os.path.join(self.media_root, self.upload_obj.dataset))
+        self.assertEqual(self.client.get(self.url).status_code, 409)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get(self.url, {"metrics": "speed"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"pressure_min": "high"}).status_code, 400)
+
+
+# -----------------------------
+# UPLOAD HISTORY
+# -----------------------------
+class UploadListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(7):
+            Upload.objects.create(user=self.user, file_name=f"f{i}.csv")
+        # Ties on uploaded_at are broken by id
+        same = timezone.now()
+        Upload.objects.filter(file_name__in=["f2.csv", "f3.csv", "f4.csv"]).update(uploaded_at=same)
+        other = User.objects.create_user("bob")
+        Upload.objects.create(user=other, file_name="theirs.csv")
+
+    def expected_ids(self):
+        uploads = Upload.objects.filter(user=self.user).order_by("-uploaded_at", "-id")
+        return list(uploads.values_list("id", flat=True))
+
+    def test_pages_cover_the_history_once(self):
+        ids, url = [], "/api/uploads/?limit=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [u["id"] for u in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(ids, self.expected_ids())
+
+    def test_since_id(self):
+        ids = sorted(self.expected_ids())
+        response = self.client.get(f"/api/uploads/?since_id={ids[4]}")
+        self.assertEqual(sorted(u["id"] for u in response.data["results"]), ids[5:])
+
+    def test_invalid_parameters(self):
+        for query in ("cursor=bogus", "limit=x", "since_id=x", "fields=nope"):
+            self.assertEqual(self.client.get(f"/api/uploads/?{query}").status_code, 400, query)
+
+    def test_summary_serializer_matches_model_serializer(self):
+        # The uploads of setUp have empty stats, this one has real ones
+        Upload.objects.create(
+            user=self.user, file_name="full.csv", total_records=12,
+            avg_flowrate=101.25, avg_pressure=6.5, avg_temperature=-3.0,
+            type_distribution={"Pump": 12}, per_type_stats={"Pump": {"count": 12}},
+        )
+        full = UploadSerializer(Upload.objects.filter(user=self.user), many=True).data
+        expected = [{f: row[f] for f in SUMMARY_FIELDS} for row in full]
+        summary = UploadSummarySerializer(
+            Upload.objects.filter(user=self.user).only(*SUMMARY_FIELDS), many=True
+        ).data
+        self.assertEqual(summary, expected)
+        self.assertEqual(json.dumps(summary), json.dumps(expected))
+
+        upload = Upload.objects.get(file_name="f0.csv")
+        self.assertEqual(
+            UploadSummarySerializer(upload, fields=["id", "uploaded_at"]).data,
+            UploadSerializer(upload, fields=["id", "uploaded_at"]).data,
+        )
+
+
+# -----------------------------
+# RESPONSE CACHING
+# -----------------------------
+class ResponseCacheTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.first = self.upload(make_csv(20, seed=1), "a.csv")
+        self.second = self.upload(make_csv(20, seed=2), "b.csv")
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_matching_etag_is_not_modified(self):
+        for url in (f"/api/uploads/{self.first.pk}/", "/api/uploads/", "/api/rollups/"):
+            etag = self.etag(url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response["ETag"], etag)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}, "other"')
+            self.assertEqual(response.status_code, 304, url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH='"other"')
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_list_etag_follows_creates_and_deletes(self):
+        before = self.etag("/api/uploads/")
+        third = self.upload(make_csv(20, seed=3), "c.csv")
+        created = self.etag("/api/uploads/")
+        self.assertNotEqual(created, before)
+
+        self.first.delete()
+        deleted = self.etag("/api/uploads/")
+        self.assertNotIn(deleted, (before, created))
+        # Same count as ``deleted``, other uploads
+        third.delete()
+        self.upload(make_csv(20, seed=4), "d.csv")
+        self.assertNotIn(self.etag("/api/uploads/"), (before, created, deleted))
+
+    def test_delete_invalidates_the_cached_payload(self):
+        url = f"/api/uploads/{self.first.pk}/"
+        self.assertEqual(self.client.get(url).data["file_name"], "a.csv")
+        # Uploads never change, so the cached payload is served
+        Upload.objects.filter(pk=self.first.pk).update(file_name="renamed.csv")
+        self.assertEqual(self.client.get(url).data["file_name"], "a.csv")
+
+        # A new upload reusing the id must not get the old payload
+        pk, uploaded_at = self.first.pk, self.first.uploaded_at
+        self.first.delete()
+        Upload.objects.create(pk=pk, user=self.user, file_name="new.csv", uploaded_at=uploaded_at)
+        self.assertEqual(self.client.get(url).data["file_name"], "new.csv")
+
+
+# -----------------------------
+# ROLLUPS
+# -----------------------------
+class RollupTests(MediaTestCase):
+    def rollup_totals(self):
+        response = self.client.get("/api/rollups/")
+        self.assertEqual(response.status_code, 200)
+        return [(r["total_records"], r["avg_pressure"]) for r in response.data["results"]]
+
+    def test_rollups_pool_the_uploads_of_a_day(self):
+        a = make_csv(40, seed=1)
+        b = make_csv(60, seed=2)
+        self.upload(a)
+        self.upload(b)
+        [(total, avg_pressure)] = self.rollup_totals()
+        both = pd.concat([reference_frame(a), reference_frame(b)])
+        self.assertEqual(total, 100)
+        self.assertAlmostEqual(avg_pressure, both["pressure"].mean(), places=6)
+
+    def test_deleting_an_upload_updates_the_rollups(self):
+        self.upload(make_csv(40, seed=1))
+        second = self.upload(make_csv(60, seed=2))
+        second.delete()
+        [(total, _)] = self.rollup_totals()
+        self.assertEqual(total, 40)
+
+        Upload.objects.all().delete()
+        self.assertEqual(self.rollup_totals(), [])
+        self.assertFalse(TypeRollup.objects.exists())
+
+    def test_deleting_the_user(self):
+        self.upload(make_csv(40))
+        self.user.delete()
+        self.assertFalse(TypeRollup.objects.exists())
+
+
+# -----------------------------
+# DUPLICATE UPLOADS
+# -----------------------------
+class DuplicateUploadTests(MediaTestCase):
+    def post(self, data, name="data.csv"):
+        response = self.client.post("/api/upload_csv/", {"file": ContentFile(data, name=name)})
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def test_repeated_upload_reuses_the_results(self):
+        first = self.post(make_csv(30))
+        again = self.post(make_csv(30), "copy.csv")
+        self.assertFalse(first["cached"])
+        self.assertTrue(again["cached"])
+        self.assertEqual(again["per_type_stats"], first["per_type_stats"])
+        self.assertEqual(again["data"]["file_name"], "copy.csv")
+
+    def test_other_users_uploads_are_not_reused(self):
+        other = User.objects.create_user("bob")
+        theirs = self.upload(make_csv(30), user=other)
+        mine = self.post(make_csv(30))
+        self.assertFalse(mine["cached"])
+        self.assertNotEqual(Upload.objects.get(pk=mine["data"]["id"]).dataset, theirs.dataset)
+
+
+# -----------------------------
+# BULK UPLOADS
+# -----------------------------
+def make_zip(members, corrupt=()):
+    """A ZIP archive of ``members`` (name -> bytes); ``corrupt`` ones fail their CRC."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    raw = buffer.getvalue()
+    for name in corrupt:
+        data = members[name]
+        offset = raw.index(data) + len(data) - 2
+        raw = raw[:offset] + b"9" + raw[offset + 1:]
+    return raw
+
+
+class BulkUploadTests(MediaTestCase):
+    def post(self, *files):
+        response = self.client.post(
+            "/api/upload_csv/bulk/",
+            {"files": [ContentFile(data, name=name) for name, data in files]},
+        )
+        return response.status_code, {r["file_name"]: r for r in response.data["results"]}
+
+    def datasets(self):
+        root = os.path.join(self.media_root, "datasets")
+        return sorted(os.listdir(root)) if os.path.isdir(root) else []
+
+    def test_failures_are_reported_per_file(self):
+        archive = make_zip(
+            {"good.csv": make_csv(20, seed=1), "broken.csv": make_csv(20, seed=2)},
+            corrupt=["broken.csv"],
+        )
+        status, results = self.post(
+            ("batch.zip", archive),
+            ("plain.csv", make_csv(10, seed=3)),
+            ("columns.csv", b"a,b\n1,2\n"),
+        )
+        self.assertEqual(status, 201)
+        self.assertEqual(results["batch.zip/good.csv"]["status"], "created")
+        self.assertEqual(results["plain.csv"]["status"], "created")
+        self.assertEqual(results["batch.zip/broken.csv"]["status"], "failed")
+        self.assertIn("Could not extract", results["batch.zip/broken.csv"]["error"])
+        self.assertEqual(results["columns.csv"]["status"], "failed")
+        self.assertEqual(Upload.objects.count(), 2)
+
+        stored = sorted(u.dataset.split("/")[1] for u in Upload.objects.all())
+        self.assertEqual(self.datasets(), stored)
+
+    def test_unexpected_worker_error_only_fails_that_file(self):
+        from .parallel import ingest_file
+
+        def flaky(path, *args):
+            with open(path, "rb") as f:
+                if b"BAD-0" in f.read():
+                    raise ValueError("boom")
+            return ingest_file(path, *args)
+
+        with ThreadPoolExecutor(2) as pool, \
+                mock.patch("analyzer.bulk.get_pool", return_value=pool), \
+                mock.patch("analyzer.bulk.ingest_file", flaky), \
+                self.assertLogs("analyzer.bulk", "ERROR"):
+            status, results = self.post(
+                ("ok.csv", make_csv(10, seed=1)),
+                ("bad.csv", HEADER.encode() + b"BAD-0,Valve,1,2,3\n"),
+            )
+        self.assertEqual(status, 201)
+        self.assertEqual(results["ok.csv"]["status"], "created")
+        self.assertEqual(results["bad.csv"]["error"], "Internal error while processing the file")
+        self.assertEqual(len(self.datasets()), 1)
+
+    def test_datasets_are_removed_when_storing_fails(self):
+        with mock.patch("analyzer.bulk.record_upload", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self.post(("a.csv", make_csv(10, seed=1)), ("b.csv", make_csv(10, seed=2)))
+        self.assertEqual(self.datasets(), [])
+        self.assertFalse(Upload.objects.exists())
+
+
+# -----------------------------
+# STREAMED UPLOADS
+# -----------------------------
+class UploadHandlerTests(MediaTestCase):
+    def test_temp_dir_is_created_with_the_first_upload(self):
+        temp_dir = os.path.join(self.media_root, "tmp")
+        self.assertFalse(os.path.exists(temp_dir))
+        response = self.client.post(
+            "/api/upload_csv/", {"file": ContentFile(make_csv(5), name="a.csv")}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(os.path.isdir(temp_dir))
+        self.assertEqual(os.listdir(temp_dir), [])
+
+    @override_settings(MAX_UPLOAD_SIZE=1000)
+    def test_oversized_upload_is_rejected(self):
+        for url, field in (("/api/upload_csv/", "file"), ("/api/upload_csv/bulk/", "files")):
+            response = self.client.post(url, {field: ContentFile(make_csv(100), name="big.csv")})
+            self.assertEqual(response.status_code, 413, url)
+            self.assertIn("big.csv", response.data["error"])
+        self.assertFalse(Upload.objects.exists())
+
+    def test_queued_upload_keeps_the_streamed_digest(self):
+        data = make_csv(50)
+        with mock.patch("analyzer.views.enqueue"):
+            response = self.client.post(
+                "/api/upload_csv/?async=1", {"file": ContentFile(data, name="a.csv")}
+            )
+        self.assertEqual(response.status_code, 202)
+        digest = hashlib.blake2b(data, digest_size=32).hexdigest()
+        self.assertEqual(IngestJob.objects.get().content_hash, digest)
+
+        with mock.patch("analyzer.services.file_digest", side_effect=AssertionError):
+            run_pending()
+        self.assertEqual(Upload.objects.get().content_hash, digest)
+
+
+# -----------------------------
+# RESUMABLE UPLOADS
+# -----------------------------
+class ResumableUploadTests(MediaTestCase):
+    CHUNK = 64 * 1024
+
+    def setUp(self):
+        super().setUp()
+        self.data = make_csv(5000)
+        response = self.client.post("/api/upload_csv/sessions/", {
+            "file_name": "big.csv", "size": len(self.data), "chunk_size": self.CHUNK,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.session_url = f"/api/upload_csv/sessions/{response.data['session_id']}/"
+        self.total = response.data["total_chunks"]
+
+    def put(self, index, body=None, checksum=None):
+        body = self.data[index * self.CHUNK:(index + 1) * self.CHUNK] if body is None else body
+        return self.client.put(
+            f"{self.session_url}chunks/{index}/", body, content_type="application/octet-stream",
+            HTTP_X_CHUNK_SHA256=checksum or hashlib.sha256(body).hexdigest(),
+        )
+
+    def put_all(self):
+        for index in range(self.total):
+            self.assertEqual(self.put(index).status_code, 200)
+
+    def session(self):
+        return UploadSession.objects.get()
+
+    def test_chunks_in_any_order_then_finalize(self):
+        self.assertGreater(self.total, 1)
+        for index in reversed(range(1, self.total)):
+            self.assertEqual(self.put(index).status_code, 200)
+        self.assertEqual(self.client.post(f"{self.session_url}finalize/").status_code, 409)
+        self.assertEqual(self.put(0).status_code, 200)
+        self.assertEqual(self.put(0).status_code, 200)  # retried chunk
+        received = self.client.get(self.session_url).data["received"]
+        self.assertEqual(received, list(range(self.total)))
+
+        response = self.client.post(f"{self.session_url}finalize/")
+        self.assertEqual(response.status_code, 202)
+        again = self.client.post(f"{self.session_url}finalize/")
+        self.assertEqual(again.data["job_id"], response.data["job_id"])
+
+        run_pending()
+        job = IngestJob.objects.get(pk=response.data["job_id"])
+        self.assertEqual(job.status, IngestJob.DONE)
+        self.assertEqual(job.upload.total_records, 5000)
+
+    def test_bad_chunks_are_rejected(self):
+        self.assertEqual(self.put(0, checksum="0" * 64).status_code, 400)
+        self.assertEqual(self.put(0, body=self.data[:100]).status_code, 400)
+        self.assertEqual(self.put(5).status_code, 400)
+        self.assertEqual(self.client.get(self.session_url).data["received"], [])
+
+    def test_finalize_can_be_retried_after_a_failure(self):
+        self.put_all()
+        with mock.patch("analyzer.resumable.IngestJob.objects.create", side_effect=OSError("disk")):
+            with self.assertRaises(OSError):
+                finalize_session(self.session())
+        session = self.session()
+        self.assertEqual(session.status, UploadSession.OPEN)
+        received = self.client.get(self.session_url).data["received"]
+        self.assertEqual(received, list(range(self.total)))
+
+        job = finalize_session(session)
+        self.assertEqual(self.session().job, job)
+
+    def test_finished_sessions_are_purged(self):
+        self.put_all()
+        finalize_session(self.session())
+        purge_expired()
+        self.assertTrue(UploadSession.objects.exists())
+        run_pending()
+        purge_expired()
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "sessions")), [])
+
+
+# -----------------------------
+# CHARTS & REPORTS
+# -----------------------------
+class ChartAndReportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload_obj = self.upload(make_csv(200))
+        self.base = f"/api/uploads/{self.upload_obj.pk}/"
+
+    def test_tail_types_are_folded_into_other(self):
+        lines = [HEADER]
+        for k in range(10):
+            for j in range(k + 1):
+                lines.append(f"EQ-{k}-{j},T{k},{k + j},{k * 2.5 + j},{100 + k}\n")
+        data = "".join(lines).encode()
+        upload = self.upload(data, "types.csv")
+        df = reference_frame(data)
+
+        response = self.client.get(f"/api/uploads/{upload.pk}/charts/", {"top": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["labels"], ["T9", "T8", "T7", "Other"])
+        self.assertEqual(response.data["counts"], [10, 9, 8, 28])
+        self.assertEqual(response.data["other"], {"types": 7, "count": 28})
+        self.assertEqual(response.data["total_types"], 10)
+        tail = df[~df["type"].isin(["T9", "T8", "T7"])]
+        self.assertAlmostEqual(response.data["series"]["avg_pressure"][-1], tail["pressure"].mean())
+
+        response = self.client.get(f"/api/uploads/{upload.pk}/charts/", {"top": 0})
+        self.assertEqual(len(response.data["labels"]), 10)
+        self.assertIsNone(response.data["other"])
+
+    def test_rendered_chart_is_cached_until_delete(self):
+        url = self.base + "charts/bar.png"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first["Content-Type"], "image/png")
+        image = b"".join(first.streaming_content)
+        self.assertTrue(image.startswith(b"\x89PNG"))
+
+        with mock.patch("analyzer.rendering.render_chart", side_effect=AssertionError), \
+                mock.patch("analyzer.rendering.get_pool", side_effect=AssertionError):
+            second = self.client.get(url)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(b"".join(second.streaming_content), image)
+
+        chart_dir = os.path.join(self.media_root, "charts", str(self.upload_obj.pk))
+        self.assertTrue(os.listdir(chart_dir))
+        self.upload_obj.delete()
+        self.assertFalse(os.path.exists(chart_dir))
+
+    def test_report_is_a_pdf(self):
+        response = self.client.get(self.base + "report.pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+    def test_batch_zip_covers_the_date_range(self):
+        second = self.upload(make_csv(30, seed=5), "second.csv")
+        old = self.upload(make_csv(30, seed=6), "old.csv")
+        Upload.objects.filter(pk=old.pk).update(uploaded_at=timezone.now() - timedelta(days=3))
+        today = timezone.localdate().isoformat()
+
+        response = self.client.post("/api/reports/", {"start": today, "end": today}, format="json")
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(archive.namelist(), [
+            f"report-{self.upload_obj.pk}-data.pdf", f"report-{second.pk}-second.pdf",
+        ])
+        for name in archive.namelist():
+            self.assertTrue(archive.read(name).startswith(b"%PDF"))
+
+    def break_pool(self, workers, name):
+        pool = get_pool(workers, name=name)
+        with self.assertRaises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+        return pool
+
+    def test_crashed_render_pool_is_replaced(self):
+        pool = self.break_pool(settings.CHART_RENDER_WORKERS, "render")
+        response = self.client.get(self.base + "charts/pie.svg")
+        self.assertEqual(response.status_code, 503)
+        self.assertIsNot(get_pool(settings.CHART_RENDER_WORKERS, name="render"), pool)
+        self.assertEqual(self.client.get(self.base + "charts/pie.svg").status_code, 200)
+
+    def test_crashed_report_pool_is_replaced(self):
+        pool = self.break_pool(settings.REPORT_WORKERS, "reports")
+        self.assertEqual(self.client.get(self.base + "report.pdf").status_code, 503)
+        self.assertIsNot(get_pool(settings.REPORT_WORKERS, name="reports"), pool)
+        self.assertEqual(self.client.get(self.base + "report.pdf").status_code, 200)
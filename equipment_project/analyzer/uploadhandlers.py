@@ -0,0 +1,68 @@
+"""
+Upload handler that streams every uploaded file to a temporary file under
+``UPLOAD_TEMP_DIR`` (inside MEDIA_ROOT), hashing it as the bytes
+arrive and rejecting it as soon as it grows past ``MAX_UPLOAD_SIZE``.
+The directory is created with the first upload.
+
+Nothing is buffered in memory, the BLAKE2b digest used for deduplication
+comes for free (``uploaded_file.content_hash``), and since the temporary
+file lives on the same filesystem as MEDIA_ROOT, storing it for a
+background job is a rename rather than a copy.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+def upload_temp_dir():
+    """UPLOAD_TEMP_DIR, created on first use."""
+    os.makedirs(settings.UPLOAD_TEMP_DIR, exist_ok=True)
+    return settings.UPLOAD_TEMP_DIR
+
+
+class StagedUploadedFile(TemporaryUploadedFile):
+    """A ``TemporaryUploadedFile`` in UPLOAD_TEMP_DIR rather than FILE_UPLOAD_TEMP_DIR."""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix=".upload" + ext, dir=upload_temp_dir())
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+
+
+class HashingFileUploadHandler(FileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = StagedUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.digest = hashlib.blake2b(digest_size=32)
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.MAX_UPLOAD_SIZE:
+            self.upload_interrupted()
+            # Checked by the views, which answer 413
+            self.request.rejected_upload = self.file_name
+            raise StopUpload(connection_reset=False)
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.content_hash = self.digest.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            path = self.file.temporary_file_path()
+            try:
+                self.file.close()
+                os.remove(path)
+            except FileNotFoundError:
+                pass
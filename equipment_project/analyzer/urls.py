@@ -1,8 +1,27 @@
 from django.urls import path
-from .views import login_view, upload_csv, register_view
+from .views import (
+    analyze_upload, job_detail, login_view, upload_bulk, upload_chart_image, upload_charts,
+    upload_csv, upload_detail, upload_list, upload_report, register_view, report_batch,
+    rollup_list, upload_session_chunk, upload_session_create, upload_session_detail,
+    upload_session_finalize,
+)
 
 urlpatterns = [
     path("register/", register_view),
     path("login/", login_view),
     path("upload_csv/", upload_csv),
+    path("upload_csv/bulk/", upload_bulk),
+    path("upload_csv/sessions/", upload_session_create),
+    path("upload_csv/sessions/<uuid:session_id>/", upload_session_detail),
+    path("upload_csv/sessions/<uuid:session_id>/chunks/<int:index>/", upload_session_chunk),
+    path("upload_csv/sessions/<uuid:session_id>/finalize/", upload_session_finalize),
+    path("jobs/<uuid:job_id>/", job_detail, name="job-detail"),
+    path("uploads/", upload_list),
+    path("uploads/<int:upload_id>/", upload_detail),
+    path("uploads/<int:upload_id>/analyze/", analyze_upload),
+    path("uploads/<int:upload_id>/charts/", upload_charts),
+    path("uploads/<int:upload_id>/charts/<slug:kind>.<slug:fmt>", upload_chart_image),
+    path("uploads/<int:upload_id>/report.pdf", upload_report),
+    path("reports/", report_batch),
+    path("rollups/", rollup_list),
 ]
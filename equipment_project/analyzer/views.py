@@ -1,11 +1,36 @@
-import pandas as pd
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.template.defaultfilters import filesizeformat
+from django.urls import reverse
+from django.utils.dateparse import parse_date
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from .models import Upload
-from .serializers import UploadSerializer
+from .analysis import analyze_dataset
+from .bulk import process_bulk
+from .caching import cached_response, not_modified, rollup_etag, upload_etag, user_etag
+from .charts import chart_series, top_param
+from .ingest import IngestError
+from .jobs import enqueue
+from .models import IngestJob, Upload, UploadSession
+from .pagination import InvalidCursor, decode_cursor, page_size, paginate
+from .parallel import WorkerCrashed
+from .rendering import CHART_KINDS, DEFAULT_SIZE, FORMATS, chart_image, size_param
+from .reports import MAX_BATCH_SIZE, REPORT_FIELDS, render_one, report_filename, stream_zip
+from .resumable import (
+    CHECKSUM_HEADER, ChunkError, abort_session, create_session, finalize_session,
+    purge_expired, received_chunks, write_chunk,
+)
+from .rollups import BUCKETS, query_rollups
+from .serializers import (
+    HEAVY_INTERNAL_FIELDS, SUMMARY_FIELDS, IngestJobSerializer, UploadSerializer,
+    UploadSummarySerializer,
+)
+from .services import check_header, process_upload
+from .stats import METRICS, upload_stats
+from .storage import Dataset
 from django.contrib.auth.models import User
 from rest_framework import status
 
@@ -54,7 +79,11 @@ def login_view(request):
     token, _ = Token.objects.get_or_create(user=user)
 
     # last 5 uploads
-    uploads = Upload.objects.filter(user=user).order_by("-uploaded_at")[:5]
+    uploads = (
+        Upload.objects.filter(user=user)
+        .defer(*HEAVY_INTERNAL_FIELDS)
+        .order_by("-uploaded_at", "-id")[:5]
+    )
     uploads_data = UploadSerializer(uploads, many=True).data
 
     return Response({
@@ -68,100 +97,606 @@ def login_view(request):
 # CSV UPLOAD
 # -----------------------------
 
+def upload_result(upload, message="File processed successfully"):
+    return {
+        "message": message,
+        "overall_stats": {
+            "total_records": upload.total_records,
+            "avg_flowrate": upload.avg_flowrate,
+            "avg_pressure": upload.avg_pressure,
+            "avg_temperature": upload.avg_temperature,
+            "type_distribution": upload.type_distribution
+        },
+        "per_type_stats": upload.per_type_stats,
+        "data": UploadSerializer(upload).data
+    }
+
+
+def too_large(file_name):
+    limit = filesizeformat(settings.MAX_UPLOAD_SIZE)
+    return Response(
+        {"error": f"'{file_name}' exceeds the maximum upload size of {limit}"},
+        status=413,
+    )
+
+
+def queued_response(request, job):
+    return Response({
+        "message": "File queued for processing",
+        "job_id": str(job.pk),
+        "status": job.status,
+        "status_url": request.build_absolute_uri(reverse("job-detail", args=[job.pk])),
+    }, status=202)
+
+
+def rejected_upload(request):
+    """A 413 response when the upload handler refused a file for its size."""
+    # Set by HashingFileUploadHandler on the HttpRequest, which DRF proxies
+    file_name = getattr(request, "rejected_upload", None)
+    if file_name is None:
+        return None
+    return too_large(file_name)
+
+
+def wants_async(request):
+    value = request.query_params.get("async", request.data.get("async", ""))
+    return str(value).lower() in ("1", "true", "yes")
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def upload_csv(request):
     file = request.FILES.get("file")
 
+    rejection = rejected_upload(request)
+    if rejection is not None:
+        return rejection
+
     if not file:
         return Response({"error": "No file uploaded"}, status=400)
 
-    # Load CSV
-    df = pd.read_csv(file)
+    # Store the file and let the worker pool process it, once the header
+    # shows it is worth queueing
+    if wants_async(request):
+        try:
+            check_header(file)
+        except IngestError as exc:
+            return Response({"error": str(exc)}, status=400)
+        job = IngestJob.objects.create(
+            user=request.user, file=file, file_name=file.name,
+            content_hash=getattr(file, "content_hash", ""),
+        )
+        enqueue(job)
+        return queued_response(request, job)
+
+    try:
+        upload, cached = process_upload(request.user, file.name, file)
+    except IngestError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    result = upload_result(upload)
+    result["cached"] = cached
+    return Response(result, status=201)
 
-    # Normalize column names (remove spaces, lowercase)
-    df.columns = [c.strip().replace(" ", "").lower() for c in df.columns]
 
-    # Flexible column mapping
-    column_map = {
-        "equipment": ["equipment", "equipmentname", "equipment_name"],
-        "type": ["type"],
-        "flowrate": ["flowrate", "flow_rate"],
-        "pressure": ["pressure"],
-        "temperature": ["temperature", "temp"],
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def upload_bulk(request):
+    """Many CSV files (``files``) and/or ZIP archives of CSV files at once."""
+    files = request.FILES.getlist("files") + request.FILES.getlist("file")
+
+    rejection = rejected_upload(request)
+    if rejection is not None:
+        return rejection
+    if not files:
+        return Response({"error": "No files uploaded"}, status=400)
+
+    try:
+        outcomes = process_bulk(request.user, files)
+    except IngestError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    results = []
+    for outcome in outcomes:
+        if outcome.error is not None:
+            results.append({"file_name": outcome.file_name, "status": "failed", "error": outcome.error})
+        else:
+            results.append({
+                "file_name": outcome.file_name,
+                "status": "created",
+                "cached": outcome.cached,
+                "data": UploadSerializer(outcome.upload).data,
+            })
+
+    created = sum(1 for r in results if r["status"] == "created")
+    return Response({
+        "message": f"{created} of {len(results)} files processed successfully",
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }, status=201 if created else 400)
+
+
+# -----------------------------
+# RESUMABLE UPLOADS (see analyzer.resumable)
+# -----------------------------
+def session_result(session):
+    received = received_chunks(session) if session.status == UploadSession.OPEN else []
+    return {
+        "session_id": str(session.pk),
+        "file_name": session.file_name,
+        "size": session.size,
+        "chunk_size": session.chunk_size,
+        "total_chunks": session.total_chunks,
+        "received": received,
+        "status": session.status,
+        "job_id": str(session.job_id) if session.job_id else None,
     }
 
-    final_cols = {}
-
-    # Match real columns to standard names
-    for standard, possible_names in column_map.items():
-        found_col = None
-        for col in df.columns:
-            if col.lower() in possible_names:
-                found_col = col
-                break
-        if not found_col:
-            return Response({"error": f"Missing required column '{standard}'"}, status=400)
-        final_cols[standard] = found_col
-
-    # Rename DF columns to standard names
-    df = df.rename(columns=final_cols)
-
-    # Ensure numeric conversion
-    df["flowrate"] = pd.to_numeric(df["flowrate"], errors="coerce")
-    df["pressure"] = pd.to_numeric(df["pressure"], errors="coerce")
-    df["temperature"] = pd.to_numeric(df["temperature"], errors="coerce")
-
-    df = df.dropna()
-
-    # -------------------------------
-    # OVERALL STATISTICS
-    # -------------------------------
-    total_records = len(df)
-    avg_flowrate = float(df["flowrate"].mean())
-    avg_pressure = float(df["pressure"].mean())
-    avg_temperature = float(df["temperature"].mean())
-    type_distribution = df["type"].value_counts().to_dict()
-
-    # -------------------------------
-    # PER-TYPE STATISTICS
-    # -------------------------------
-    grouped_stats = {}
-
-    for t, group in df.groupby("type"):
-        grouped_stats[t] = {
-            "count": len(group),
-            "avg_flowrate": float(group["flowrate"].mean()),
-            "avg_pressure": float(group["pressure"].mean()),
-            "avg_temperature": float(group["temperature"].mean()),
+
+def get_session(request, session_id):
+    return UploadSession.objects.filter(pk=session_id, user=request.user).first()
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def upload_session_create(request):
+    """Start a resumable upload: ``file_name``, ``size`` and optional ``chunk_size`` in bytes."""
+    file_name = str(request.data.get("file_name", "")).strip()
+    if not file_name:
+        return Response({"error": "'file_name' is required"}, status=400)
+    try:
+        size = int(request.data.get("size"))
+        chunk_size = int(request.data.get("chunk_size") or 0) or None
+    except (TypeError, ValueError):
+        return Response({"error": "'size' and 'chunk_size' must be integers"}, status=400)
+    if size > settings.MAX_UPLOAD_SIZE:
+        return too_large(file_name)
+
+    purge_expired()
+    try:
+        session = create_session(request.user, file_name, size, chunk_size)
+    except ChunkError as exc:
+        return Response({"error": str(exc)}, status=400)
+    return Response(session_result(session), status=201)
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAuthenticated])
+def upload_session_detail(request, session_id):
+    """Chunks received so far (GET), or abort the upload (DELETE)."""
+    session = get_session(request, session_id)
+    if session is None:
+        return Response({"error": "Upload session not found"}, status=404)
+
+    if request.method == "DELETE":
+        if session.status != UploadSession.OPEN:
+            return Response({"error": "The upload was already finalized"}, status=409)
+        abort_session(session)
+        return Response(status=204)
+    return Response(session_result(session))
+
+
+@api_view(["PUT"])
+@permission_classes([IsAuthenticated])
+def upload_session_chunk(request, session_id, index):
+    """Raw chunk bytes as the body, their SHA-256 hex digest in X-Chunk-SHA256."""
+    session = get_session(request, session_id)
+    if session is None:
+        return Response({"error": "Upload session not found"}, status=404)
+    if session.status != UploadSession.OPEN:
+        return Response({"error": "The upload was already finalized"}, status=409)
+
+    try:
+        write_chunk(session, index, request.stream, request.META.get(CHECKSUM_HEADER))
+    except ChunkError as exc:
+        return Response({"error": str(exc)}, status=400)
+    return Response({"index": index, "received": len(received_chunks(session))})
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def upload_session_finalize(request, session_id):
+    """Queue the complete file for processing; answered like ``?async=1`` uploads."""
+    session = get_session(request, session_id)
+    if session is None:
+        return Response({"error": "Upload session not found"}, status=404)
+
+    try:
+        job = finalize_session(session)
+    except ChunkError as exc:
+        return Response({"error": str(exc), **session_result(session)}, status=409)
+    except IngestError as exc:
+        return Response({"error": str(exc)}, status=400)
+    return queued_response(request, job)
+
+
+# -----------------------------
+# REQUEST PARAMETERS
+# -----------------------------
+def list_param(params, name):
+    """A list parameter given as a JSON list, repeated keys or comma separated."""
+    if hasattr(params, "getlist"):
+        values = params.getlist(name)
+    else:
+        values = params.get(name) or []
+        if not isinstance(values, list):
+            values = [values]
+    items = []
+    for value in values:
+        items.extend(v.strip() for v in str(value).split(",") if v.strip())
+    return items
+
+
+def float_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be a number")
+
+
+def int_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{name}' must be an integer")
+
+
+# -----------------------------
+# UPLOAD HISTORY
+# -----------------------------
+UPLOAD_FIELDS = list(UploadSerializer().fields)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def upload_list(request):
+    """
+    Upload history, newest first, in pages of ``limit``. ``since_id`` only
+    returns uploads created after that one (ids only grow), which lets
+    clients keep a local copy of the history in sync incrementally.
+    """
+    params = request.query_params
+
+    # Summary fields by default; the JSON stats only when asked for
+    fields = list_param(params, "fields") or SUMMARY_FIELDS
+    unknown = [f for f in fields if f not in UPLOAD_FIELDS]
+    if unknown:
+        return Response({"error": f"Unknown field '{unknown[0]}'"}, status=400)
+
+    try:
+        limit = page_size(params.get("limit"))
+        since_id = int_param(params, "since_id")
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    cursor = params.get("cursor")
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except InvalidCursor as exc:
+            return Response({"error": str(exc)}, status=400)
+
+    def build():
+        # Only load the selected columns (plus the pagination key)
+        columns = set(fields) | {"id", "uploaded_at"}
+        queryset = Upload.objects.filter(user=request.user).only(*columns)
+        if since_id is not None:
+            queryset = queryset.filter(id__gt=since_id)
+        uploads, next_cursor = paginate(queryset, cursor, limit)
+
+        if set(fields) <= set(SUMMARY_FIELDS):
+            results = UploadSummarySerializer(uploads, many=True, fields=fields).data
+        else:
+            results = UploadSerializer(uploads, many=True, fields=fields).data
+
+        next_url = None
+        if next_cursor:
+            query = params.copy()
+            query["cursor"] = next_cursor
+            next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+        return {
+            "results": results,
+            "next_cursor": next_cursor,
+            "next": next_url,
         }
 
-    # SAVE To database
-    upload = Upload.objects.create(
-        user=request.user,
-        file_name=file.name,
-        total_records=total_records,
-        avg_flowrate=avg_flowrate,
-        avg_pressure=avg_pressure,
-        avg_temperature=avg_temperature,
-        type_distribution=type_distribution,
-         per_type_stats=grouped_stats,
+    # The payload embeds the next page URL, so key on the full request URL
+    etag = user_etag(request.user, "uploads", {"url": request.build_absolute_uri()})
+    return cached_response(request, etag, build, user_id=request.user.pk)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def upload_detail(request, upload_id):
+    if not Upload.objects.filter(pk=upload_id, user=request.user).exists():
+        return Response({"error": "Upload not found"}, status=404)
+
+    def build():
+        upload = Upload.objects.defer(*HEAVY_INTERNAL_FIELDS).get(pk=upload_id)
+        return UploadSerializer(upload).data
+
+    return cached_response(request, upload_etag(upload_id, "upload"), build, upload_id=upload_id)
+
+
+# -----------------------------
+# CHART DATA
+# -----------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def upload_charts(request, upload_id):
+    if not Upload.objects.filter(pk=upload_id, user=request.user).exists():
+        return Response({"error": "Upload not found"}, status=404)
+
+    params = request.query_params
+    try:
+        top = top_param(params.get("top"))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    metrics = list_param(params, "metrics") or list(METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        return Response({"error": f"Unknown metric '{unknown[0]}'"}, status=400)
+
+    def build():
+        upload = Upload.objects.only("id", "aggregate", "per_type_stats").get(pk=upload_id)
+        return chart_series(upload, top=top, metrics=metrics)
+
+    etag = upload_etag(upload_id, "charts", {"top": top, "metrics": ",".join(metrics)})
+    return cached_response(request, etag, build, upload_id=upload_id)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def upload_chart_image(request, upload_id, kind, fmt):
+    if kind not in CHART_KINDS:
+        return Response({"error": f"Unknown chart '{kind}'"}, status=404)
+    if fmt not in FORMATS:
+        return Response({"error": f"Unsupported image format '{fmt}'"}, status=404)
+
+    upload = (
+        Upload.objects.filter(pk=upload_id, user=request.user)
+        .only("id", "aggregate", "per_type_stats")
+        .first()
     )
+    if upload is None:
+        return Response({"error": "Upload not found"}, status=404)
+
+    params = request.query_params
+    try:
+        top = top_param(params.get("top"))
+        width = size_param(params.get("width"), DEFAULT_SIZE[0])
+        height = size_param(params.get("height"), DEFAULT_SIZE[1])
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    etag = upload_etag(upload_id, f"chart-{kind}", {
+        "fmt": fmt, "top": top, "width": width, "height": height,
+    })
+    if not_modified(request, etag):
+        return Response(status=304, headers={"ETag": etag})
 
-    serializer = UploadSerializer(upload)
+    try:
+        path = chart_image(upload, kind, fmt, width, height, top)
+    except WorkerCrashed as exc:
+        return Response({"error": str(exc)}, status=503)
+    response = FileResponse(open(path, "rb"), content_type=FORMATS[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
-    # -------------------------------
-    # FINAL RESPONSE
-    # -------------------------------
-    return Response({
-        "message": "File processed successfully",
+
+# -----------------------------
+# PDF REPORTS
+# -----------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def upload_report(request, upload_id):
+    upload = Upload.objects.filter(pk=upload_id, user=request.user).only(*REPORT_FIELDS).first()
+    if upload is None:
+        return Response({"error": "Upload not found"}, status=404)
+
+    try:
+        pdf = render_one(upload)
+    except WorkerCrashed as exc:
+        return Response({"error": str(exc)}, status=503)
+
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = f'attachment; filename="{report_filename(upload)}"'
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def report_batch(request):
+    """
+    ZIP of PDF reports for ``upload_ids`` (in that order) or for every
+    upload between ``start`` and ``end`` (dates, inclusive).
+    """
+    params = request.data
+    queryset = Upload.objects.filter(user=request.user).only(*REPORT_FIELDS)
+
+    ids = list_param(params, "upload_ids")
+    if ids:
+        try:
+            ids = [int(i) for i in ids]
+        except ValueError:
+            return Response({"error": "'upload_ids' must be integers"}, status=400)
+        if len(ids) > MAX_BATCH_SIZE:
+            return Response({"error": f"At most {MAX_BATCH_SIZE} reports per batch"}, status=400)
+        found = queryset.in_bulk(ids)
+        missing = [i for i in ids if i not in found]
+        if missing:
+            return Response({"error": f"Upload not found: {missing[0]}"}, status=404)
+        uploads = [found[i] for i in ids]
+    else:
+        dates = {}
+        for name in ("start", "end"):
+            value = params.get(name)
+            dates[name] = parse_date(str(value)) if value else None
+            if dates[name] is None:
+                return Response(
+                    {"error": "Provide 'upload_ids' or 'start' and 'end' dates (YYYY-MM-DD)"},
+                    status=400,
+                )
+        queryset = queryset.filter(
+            uploaded_at__date__gte=dates["start"], uploaded_at__date__lte=dates["end"]
+        ).order_by("uploaded_at", "id")
+        if queryset.count() > MAX_BATCH_SIZE:
+            return Response({"error": f"At most {MAX_BATCH_SIZE} reports per batch"}, status=400)
+        uploads = queryset.iterator(chunk_size=100)
+
+    response = StreamingHttpResponse(stream_zip(uploads), content_type="application/zip")
+    response["Content-Disposition"] = 'attachment; filename="reports.zip"'
+    return response
+
+
+# -----------------------------
+# JOB STATUS
+# -----------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def job_detail(request, job_id):
+    job = IngestJob.objects.filter(pk=job_id, user=request.user).select_related("upload").first()
+    if job is None:
+        return Response({"error": "Job not found"}, status=404)
+
+    data = IngestJobSerializer(job).data
+    if job.status == IngestJob.DONE and job.upload is not None:
+        data["result"] = upload_result(job.upload)
+    return Response(data)
+
+
+# -----------------------------
+# RE-ANALYSIS
+# -----------------------------
+NO_DATASET_ERROR = "No stored data for this upload, please upload the file again"
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def analyze_upload(request, upload_id):
+    upload = Upload.objects.filter(pk=upload_id, user=request.user).only("id", "dataset").first()
+    if upload is None:
+        return Response({"error": "Upload not found"}, status=404)
+    if not upload.dataset:
+        return Response({"error": NO_DATASET_ERROR}, status=409)
+
+    params = request.data if request.method == "POST" else request.query_params
+
+    metrics = list_param(params, "metrics") or list(METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        return Response({"error": f"Unknown metric '{unknown[0]}'"}, status=400)
+
+    try:
+        ranges = {}
+        for metric in METRICS:
+            bounds = (
+                float_param(params, f"{metric}_min"),
+                float_param(params, f"{metric}_max"),
+            )
+            if bounds != (None, None):
+                ranges[metric] = bounds
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    types = list_param(params, "types")
+
+    try:
+        dataset = Dataset.open(settings.MEDIA_ROOT, upload.dataset)
+    except FileNotFoundError:
+        return Response({"error": NO_DATASET_ERROR}, status=409)
+
+    def build():
+        aggregate = analyze_dataset(dataset, types=types, ranges=ranges, metrics=metrics)
+        stats = upload_stats(aggregate.groups(), metrics)
+        return analysis_result(upload, types, ranges, metrics, stats)
+
+    etag = upload_etag(upload.pk, "analysis", {
+        "types": ",".join(types), "metrics": ",".join(metrics), "ranges": sorted(ranges.items()),
+    })
+    return cached_response(request, etag, build, upload_id=upload.pk)
+
+
+def analysis_result(upload, types, ranges, metrics, stats):
+    return {
+        "upload_id": upload.pk,
+        "filters": {
+            "types": types,
+            **{
+                f"{m}_{side}": value
+                for m, bounds in ranges.items()
+                for side, value in zip(("min", "max"), bounds)
+            },
+        },
+        "metrics": metrics,
         "overall_stats": {
-            "total_records": total_records,
-            "avg_flowrate": avg_flowrate,
-            "avg_pressure": avg_pressure,
-            "avg_temperature": avg_temperature,
-            "type_distribution": type_distribution
+            "total_records": stats["total_records"],
+            **{f"avg_{m}": stats[f"avg_{m}"] for m in metrics},
+            "type_distribution": stats["type_distribution"],
         },
-        "per_type_stats": grouped_stats,
-        "data": serializer.data
-    }, status=201)
+        "per_type_stats": stats["per_type_stats"],
+    }
+
+
+# -----------------------------
+# ROLLUPS
+# -----------------------------
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def rollup_list(request):
+    params = request.query_params
+
+    bucket = params.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return Response({"error": f"'bucket' must be one of {', '.join(BUCKETS)}"}, status=400)
+
+    metrics = list_param(params, "metrics") or list(METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        return Response({"error": f"Unknown metric '{unknown[0]}'"}, status=400)
+
+    dates = {}
+    for name in ("start", "end"):
+        value = params.get(name)
+        dates[name] = parse_date(value) if value else None
+        if value and dates[name] is None:
+            return Response({"error": f"'{name}' must be a date (YYYY-MM-DD)"}, status=400)
+
+    types = list_param(params, "types")
+
+    def build():
+        periods = query_rollups(
+            request.user,
+            bucket=bucket,
+            start=dates["start"],
+            end=dates["end"],
+            types=types,
+        )
+
+        results = []
+        for period, aggregate in periods:
+            stats = upload_stats(aggregate.groups(), metrics)
+            results.append({
+                "period": period.isoformat(),
+                "total_records": stats["total_records"],
+                **{f"avg_{m}": stats[f"avg_{m}"] for m in metrics},
+                "per_type_stats": stats["per_type_stats"],
+            })
+
+        return {"bucket": bucket, "metrics": metrics, "results": results}
+
+    etag = rollup_etag(request.user, {
+        "bucket": bucket, "metrics": ",".join(metrics), "types": ",".join(types),
+        "start": dates["start"], "end": dates["end"],
+    })
+    return cached_response(request, etag, build, user_id=request.user.pk)
@@ -0,0 +1,97 @@
+"""
+Compare the CSV parser backends of ``analyzer.ingest`` on synthetic files.
+
+    python benchmarks/bench_parsers.py
+    python benchmarks/bench_parsers.py --rows 10000 1000000 --dirty 0.01
+
+For every row count a CSV with the usual columns (plus one unused column)
+is generated once in a temporary directory, then ingested with each
+available backend. ``--dirty`` replaces that fraction of the numeric values
+with text, which exercises the coercion paths. The 50M row file is about
+2.5 GB, so make sure the temporary directory has room for it.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.ingest import DEFAULT_CHUNK_SIZE, ingest_csv, pa, resolve_parser  # noqa: E402
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000, 10_000_000, 50_000_000]
+TYPES = np.array(["Pump", "Valve", "Reactor", "Compressor", "HeatExchanger", "Condenser"])
+BLOCK_ROWS = 1_000_000
+
+
+def generate(path, rows, dirty=0.0, seed=0):
+    """Write ``rows`` synthetic equipment rows to ``path`` in blocks."""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="") as f:
+        f.write("Equipment Name,Type,Flowrate,Pressure,Temperature,Notes\n")
+        for start in range(0, rows, BLOCK_ROWS):
+            n = min(BLOCK_ROWS, rows - start)
+            block = pd.DataFrame({
+                "Equipment Name": [f"EQ-{i}" for i in range(start, start + n)],
+                "Type": TYPES[rng.integers(0, len(TYPES), n)],
+                "Flowrate": rng.normal(120, 30, n).round(2),
+                "Pressure": rng.normal(6, 1.5, n).round(2),
+                "Temperature": rng.normal(110, 25, n).round(1),
+                "Notes": "",
+            })
+            if dirty:
+                mask = rng.random(n) < dirty
+                block["Pressure"] = block["Pressure"].astype(object)
+                block.loc[mask, "Pressure"] = "n/a"
+            block.to_csv(f, header=False, index=False)
+
+
+def bench(path, parser, chunksize, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            ingest_csv(f, chunksize=chunksize, parser=parser)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--parsers", nargs="+", default=["c", "pyarrow"])
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--dirty", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--dir", default=None, help="where to write the generated files")
+    args = parser.parse_args()
+
+    parsers = []
+    for name in args.parsers:
+        if name == "pyarrow" and pa is None:
+            print("pyarrow is not installed, skipping the pyarrow backend")
+            continue
+        parsers.append(resolve_parser(name))
+
+    print(f"{'rows':>12} {'MB':>9} {'parser':>8} {'seconds':>9} {'rows/s':>12} {'MB/s':>8}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        for rows in args.rows:
+            path = os.path.join(workdir, f"bench-{rows}.csv")
+            generate(path, rows, args.dirty)
+            megabytes = os.path.getsize(path) / 1e6
+            for name in parsers:
+                seconds = bench(path, name, args.chunksize, args.repeat)
+                print(
+                    f"{rows:>12,} {megabytes:>9.1f} {name:>8} {seconds:>9.2f} "
+                    f"{rows / seconds:>12,.0f} {megabytes / seconds:>8.1f}"
+                )
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -160,6 +162,88 @@ REST_FRAMEWORK = {
 
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Chunk checksums of resumable uploads (see analyzer.resumable)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-chunk-sha256')
+
+
+
+
+# CSV ingestion
+# Uploads are parsed in chunks of this many rows, so peak memory depends on
+# the chunk size rather than on the size of the uploaded file.
+CSV_CHUNK_SIZE = 100_000
 
+# Background ingestion
+# Uploads posted with ?async=1 are stored under MEDIA_ROOT/jobs/ and processed
+# by a thread pool of this size. `manage.py process_ingest_jobs` drains any
+# jobs left queued (e.g. after a restart), and queues running jobs again when
+# they made no progress for INGEST_JOB_TIMEOUT seconds (their worker died).
+INGEST_WORKERS = 2
+INGEST_JOB_TIMEOUT = 30 * 60
 
+# Files on disk (stored jobs, large temporary uploads) of at least this size
+# are split into line-aligned byte ranges and parsed by a process pool with
+# INGEST_PROCESSES workers. Set INGEST_PROCESSES = 1 to disable.
+INGEST_PROCESSES = os.cpu_count() or 1
+PARALLEL_INGEST_MIN_BYTES = 64 * 1024 * 1024
 
+# Keep the cleaned rows of every upload as a columnar dataset under
+# MEDIA_ROOT/datasets/ so they can be re-analysed without a new upload.
+PERSIST_DATASETS = True
+
+# Reuse the results of an earlier upload by the same user with byte-identical content
+# (matched by BLAKE2b digest) instead of parsing the file again.
+UPLOAD_DEDUP_CACHE = True
+
+# Response cache
+# Read endpoints (upload list/detail, re-analysis, rollups) send strong ETags
+# and answer If-None-Match with 304. Serialized payloads are kept in the
+# default cache for RESPONSE_CACHE_TIMEOUT seconds; use a shared backend
+# (e.g. Redis or Memcached) when running several worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'analyzer-responses',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    }
+}
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Chart images (GET /api/uploads/<id>/charts/<pie|bar>.<png|svg>) are drawn
+# by a process pool of this size and cached under MEDIA_ROOT/charts/.
+CHART_RENDER_WORKERS = 2
+
+# PDF reports (GET /api/uploads/<id>/report.pdf, POST /api/reports/) are laid
+# out by a process pool of this size; their chart images share the cache above.
+REPORT_WORKERS = 2
+
+# File uploads
+# Every uploaded file is streamed to a temporary file under UPLOAD_TEMP_DIR
+# (never held in memory, created with the first upload) and hashed on the
+# way in. Files larger than MAX_UPLOAD_SIZE are rejected with 413 before any
+# parsing.
+FILE_UPLOAD_HANDLERS = ['analyzer.uploadhandlers.HashingFileUploadHandler']
+UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'tmp')
+MAX_UPLOAD_SIZE = 1024 * 1024 * 1024
+
+# Resumable uploads (POST /api/upload_csv/sessions/) send the file in chunks
+# of UPLOAD_CHUNK_SIZE bytes, staged under MEDIA_ROOT/sessions/ until the
+# upload is finalized. Sessions that receive nothing for UPLOAD_SESSION_TTL
+# seconds are discarded, finalized ones once their job has finished.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# gzip, bz2 and zstd (needs the optional `zstandard` package) uploads are
+# detected by their magic bytes and decompressed while parsing. This caps
+# the decompressed size, MAX_UPLOAD_SIZE applies to the compressed file.
+MAX_DECOMPRESSED_SIZE = 20 * 1024 * 1024 * 1024
+
+# CSV parser backend: "c" (pandas C engine), "pyarrow" (multithreaded, needs
+# the optional pyarrow package) or "auto" (pyarrow when installed).
+# `python benchmarks/bench_parsers.py` compares them.
+CSV_PARSER = 'auto'
+
+# Extra CSV header spellings, merged into analyzer.ingest.COLUMN_MAP, e.g.
+# {'flowrate': ['Flow (m3/h)'], 'equipment': ['Tag']}. Headers are matched
+# ignoring case and spaces; an alias may not map to two columns.
+CSV_COLUMN_ALIASES = {}
@@ -238,10 +238,110 @@ const Sidebar = ({ uploads, selectedFile, onSelectFile }) => {
   );
 };
 
+// Files of at least this size use the resumable upload API: they are sent in
+// checksummed chunks, and uploading the same file again after a failure
+// continues with the chunks the server does not have yet
+const RESUMABLE_MIN_BYTES = 64 * 1024 * 1024;
+const JOB_POLL_INTERVAL_MS = 1000;
+
+const apiRequest = async (path, options = {}) => {
+  const response = await fetch(`${API_BASE_URL}/${path}`, {
+    ...options,
+    headers: {
+      'Authorization': `Token ${localStorage.getItem('token')}`,
+      ...options.headers
+    }
+  });
+  const data = response.status === 204 ? null : await response.json();
+  if (!response.ok) {
+    const error = new Error(data?.error || 'Upload failed');
+    error.status = response.status;
+    throw error;
+  }
+  return data;
+};
+
+const sha256Hex = async (blob) => {
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+const uploadResumable = async (file, onProgress) => {
+  // The session id survives reloads, so an interrupted upload can resume
+  const key = `uploadSession:${file.name}:${file.size}:${file.lastModified}`;
+  try {
+    return await sendResumable(file, key, onProgress);
+  } catch (err) {
+    err.resumable = localStorage.getItem(key) !== null;
+    throw err;
+  }
+};
+
+const sendResumable = async (file, key, onProgress) => {
+  let session = null;
+
+  const savedId = localStorage.getItem(key);
+  if (savedId) {
+    try {
+      session = await apiRequest(`upload_csv/sessions/${savedId}/`);
+    } catch {
+      localStorage.removeItem(key);  // expired, start over
+    }
+  }
+  if (!session) {
+    session = await apiRequest('upload_csv/sessions/', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ file_name: file.name, size: file.size })
+    });
+    localStorage.setItem(key, session.session_id);
+  }
+
+  const sessionUrl = `upload_csv/sessions/${session.session_id}/`;
+  let jobId = session.job_id;
+  if (!jobId) {
+    const received = new Set(session.received);
+    for (let index = 0; index < session.total_chunks; index++) {
+      if (received.has(index)) continue;
+      const chunk = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+      await apiRequest(`${sessionUrl}chunks/${index}/`, {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'X-Chunk-SHA256': await sha256Hex(chunk)
+        },
+        body: chunk
+      });
+      received.add(index);
+      onProgress(`Uploading ${Math.floor((received.size * 100) / session.total_chunks)}%`);
+    }
+
+    try {
+      jobId = (await apiRequest(`${sessionUrl}finalize/`, { method: 'POST' })).job_id;
+    } catch (err) {
+      // Not a usable CSV: the server discarded the file
+      if (err.status === 400) localStorage.removeItem(key);
+      throw err;
+    }
+  }
+
+  onProgress('Processing...');
+  for (;;) {
+    const job = await apiRequest(`jobs/${jobId}/`);
+    if (job.status === 'done' || job.status === 'failed') {
+      localStorage.removeItem(key);
+      if (job.status === 'failed') throw new Error(job.error || 'Processing failed');
+      return job.result;
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
+};
+
 // Upload CSV Component
 const UploadCSV = ({ onUploadSuccess }) => {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState('');
   const [error, setError] = useState('');
   const fileInputRef = useRef(null);
 
@@ -259,22 +359,14 @@ const UploadCSV = ({ onUploadSuccess }) => {
     setLoading(true);
     setError('');
 
-    const formData = new FormData();
-    formData.append('file', file);
-
     try {
-      const response = await fetch(`${API_BASE_URL}/upload_csv/`, {
-        method: 'POST',
-        headers: {
-          'Authorization': `Token ${localStorage.getItem('token')}`
-        },
-        body: formData
-      });
-
-      const data = await response.json();
-      
-      if (!response.ok) {
-        throw new Error(data.error || 'Upload failed');
+      let data;
+      if (file.size >= RESUMABLE_MIN_BYTES) {
+        data = await uploadResumable(file, setProgress);
+      } else {
+        const formData = new FormData();
+        formData.append('file', file);
+        data = await apiRequest('upload_csv/', { method: 'POST', body: formData });
       }
 
       onUploadSuccess(data);
@@ -283,9 +375,11 @@ const UploadCSV = ({ onUploadSuccess }) => {
         fileInputRef.current.value = '';
       }
     } catch (err) {
-      setError(err.message || 'Upload failed. Please try again.');
+      const message = err.message || 'Upload failed. Please try again.';
+      setError(err.resumable ? `${message} Upload the same file again to resume.` : message);
     } finally {
       setLoading(false);
+      setProgress('');
     }
   };
 
@@ -312,7 +406,7 @@ const UploadCSV = ({ onUploadSuccess }) => {
           disabled={loading || !file}
           className="bg-blue-500 hover:bg-blue-700 text-white font-bold py-2 px-4 rounded focus:outline-none focus:shadow-outline disabled:opacity-50"
         >
-          {loading ? 'Uploading...' : 'Upload'}
+          {loading ? progress || 'Uploading...' : 'Upload'}
         </button>
       </div>
     </div>